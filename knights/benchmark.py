@@ -0,0 +1,151 @@
+"""
+Benchmark of the entailment engines on generated knights and knaves puzzles.
+
+For every puzzle each engine is asked, for every symbol, whether the
+knowledge base entails it, and the answers are checked against the known
+solution. Reports time, work done ("nodes") and peak memory per engine.
+"""
+
+import sys
+import time
+import tracemalloc
+
+from logic import *
+import compiled
+import sat
+from generate import Puzzle, generate
+from session import Session
+
+## largest number of symbols each engine is run on
+LIMITS = {
+    "truth-table": 12,
+    "compiled": 24,
+    "sat": None,
+    "session": None,
+}
+
+
+class Counted(Sentence):
+    """
+    Wraps a knowledge base to count the models logic.model_check visits.
+    """
+
+    def __init__(self, sentence):
+        super().__init__()
+        self.sentence = sentence
+        self.count = 0
+
+    def evaluate(self, model):
+        self.count += 1
+        return self.sentence.evaluate(model)
+
+    def symbols(self):
+        return self.sentence.symbols()
+
+
+def run_truth_table(knowledge, queries):
+    counted = Counted(knowledge)
+    answers = [model_check(counted, query) for query in queries]
+    return answers, counted.count
+
+
+def run_compiled(knowledge, queries):
+    answers = []
+    nodes = 0
+    for query in queries:
+        program = compiled.Program([knowledge, query])
+        entailed = True
+        for chunk in range(program.chunks):
+            nodes += program.size
+            kb, q = program.run(chunk)
+            if kb & ~q:
+                entailed = False
+                break
+        answers.append(entailed)
+    return answers, nodes
+
+
+def run_sat(knowledge, queries):
+    answers = []
+    nodes = 0
+    for query in queries:
+        cnf = sat.CNF()
+        cnf.add(knowledge)
+        cnf.add(Not(query))
+        solver = sat.Solver(cnf)
+        answers.append(not solver.solve())
+        nodes += solver.decisions + solver.propagations
+    return answers, nodes
+
+
+def run_session(knowledge, queries):
+    session = Session(knowledge)
+    answers = session.entails_all(queries)
+    nodes = 0
+    if session.engine == "sat":
+        nodes = session.solver.decisions + session.solver.propagations
+    else:
+        nodes = len(session.models) * session.program.size
+    return answers, nodes
+
+
+ENGINES = {
+    "truth-table": run_truth_table,
+    "compiled": run_compiled,
+    "sat": run_sat,
+    "session": run_session,
+}
+
+
+def measure(engine, puzzle):
+    """
+    Returns (seconds, nodes, peak bytes) for one engine on one puzzle, and
+    raises if any answer disagrees with the puzzle's solution.
+    """
+    run = ENGINES[engine]
+    start = time.perf_counter()
+    answers, nodes = run(puzzle.knowledge, puzzle.symbols)
+    elapsed = time.perf_counter() - start
+    for symbol, entailed in zip(puzzle.symbols, answers):
+        ## only true symbols can be entailed, and all are if the solution is unique
+        if (entailed and not puzzle.truth[symbol.name]) or (
+                puzzle.unique and entailed != puzzle.truth[symbol.name]):
+            raise Exception(f"{engine} gave a wrong answer for {symbol}")
+    ## memory is measured in a second run, since tracing slows it down
+    tracemalloc.start()
+    run(puzzle.knowledge, puzzle.symbols)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, nodes, peak
+
+
+def corpus(sizes, per_size, depth, seed=0):
+    """
+    Yields generated puzzles: `per_size` for each number of inhabitants.
+    """
+    for inhabitants in sizes:
+        for n in range(per_size):
+            yield generate(inhabitants, depth, seed=seed + n)
+
+
+def main():
+    if len(sys.argv) > 2:
+        sys.exit("Usage: python benchmark.py [corpus.jsonl]")
+    if len(sys.argv) == 2:
+        with open(sys.argv[1]) as f:
+            puzzles = [Puzzle.from_json(line) for line in f if line.strip()]
+    else:
+        puzzles = list(corpus([2, 4, 6, 8, 12, 25, 50, 100], 3, 2))
+
+    print(f"{'symbols':>7} {'engine':>12} {'seconds':>10} {'nodes':>12} {'peak KiB':>10}")
+    for puzzle in puzzles:
+        n = len(puzzle.symbols)
+        for engine, limit in LIMITS.items():
+            if limit is not None and n > limit:
+                continue
+            elapsed, nodes, peak = measure(engine, puzzle)
+            print(f"{n:>7} {engine:>12} {elapsed:>10.4f} {nodes:>12} {peak / 1024:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
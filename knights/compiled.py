@@ -0,0 +1,147 @@
+"""
+Bit-parallel truth-table entailment for the sentences of logic.py.
+
+A sentence is compiled once into a flat program over registers, where
+register i holds symbol i. Each register is a Python int used as a bit
+vector with one bit per model: bit m is the value of the register in the
+model that makes symbol i true exactly when bit i of m is set. A chunk of
+2**CHUNK_BITS models is evaluated with a handful of integer operations per
+program step, instead of one `evaluate` walk of the sentence tree per model.
+"""
+
+from logic import *
+
+CHUNK_BITS = 16 ## each chunk covers 2**CHUNK_BITS models
+
+## opcodes of compiled programs
+NOT, AND, OR, IMPLIES, IFF, TRUE, FALSE = range(7)
+
+
+class Program():
+    """
+    A list of sentences compiled over a fixed, ordered list of symbol names.
+    """
+
+    def __init__(self, sentences, symbols=None):
+        if symbols is None:
+            symbols = set()
+            for sentence in sentences:
+                symbols |= sentence.symbols()
+        self.symbols = sorted(symbols)
+        self.index = {name: i for i, name in enumerate(self.symbols)}
+        self.ops = [] ## (opcode, argument registers), result goes to a new register
+        self.outputs = [self.compile(sentence) for sentence in sentences]
+        n = len(self.symbols)
+        self.width = min(n, CHUNK_BITS) ## symbols varying inside a chunk
+        self.chunks = 2 ** (n - self.width)
+        self.size = 2 ** self.width ## models per chunk
+        self.full = (1 << self.size) - 1
+        self.patterns = [column(i, self.width) for i in range(self.width)]
+
+    def compile(self, sentence):
+        """
+        Appends the ops computing `sentence` and returns its register.
+        Subtrees shared by object identity are compiled once.
+        """
+        registers = dict() ## id(sentence) -> register
+        base = len(self.symbols)
+        stack = [(sentence, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if id(node) in registers:
+                continue
+            if isinstance(node, Symbol):
+                if node.name not in self.index:
+                    raise Exception(f"variable {node.name} not in model")
+                registers[id(node)] = self.index[node.name]
+                continue
+            children = subsentences(node)
+            if not expanded:
+                stack.append((node, True))
+                stack.extend((child, False) for child in children)
+                continue
+            args = tuple(registers[id(child)] for child in children)
+            if isinstance(node, Not):
+                op = (NOT, args)
+            elif isinstance(node, And):
+                op = (AND, args) if args else (TRUE, args)
+            elif isinstance(node, Or):
+                op = (OR, args) if args else (FALSE, args)
+            elif isinstance(node, Implication):
+                op = (IMPLIES, args)
+            elif isinstance(node, Biconditional):
+                op = (IFF, args)
+            else:
+                raise TypeError("must be a logical sentence")
+            self.ops.append(op)
+            registers[id(node)] = base + len(self.ops) - 1
+        return registers[id(sentence)]
+
+    def columns(self, chunk):
+        """
+        Returns the symbol registers for chunk number `chunk`: symbols below
+        the chunk width vary inside the chunk, the others are constant.
+        """
+        columns = list(self.patterns)
+        for i in range(len(self.symbols) - self.width):
+            columns.append(self.full if chunk >> i & 1 else 0)
+        return columns
+
+    def run(self, chunk):
+        """
+        Returns one bit vector per compiled sentence for chunk number `chunk`.
+        """
+        full = self.full
+        regs = self.columns(chunk)
+        for opcode, args in self.ops:
+            if opcode == AND:
+                value = full
+                for a in args:
+                    value &= regs[a]
+            elif opcode == OR:
+                value = 0
+                for a in args:
+                    value |= regs[a]
+            elif opcode == NOT:
+                value = full ^ regs[args[0]]
+            elif opcode == IMPLIES:
+                value = (full ^ regs[args[0]]) | regs[args[1]]
+            elif opcode == IFF:
+                value = full ^ (regs[args[0]] ^ regs[args[1]])
+            elif opcode == TRUE:
+                value = full
+            else:
+                value = 0
+            regs.append(value)
+        return [regs[r] for r in self.outputs]
+
+    def model(self, chunk, bit):
+        """
+        Returns the model (dict of symbol name -> bool) at `bit` of chunk `chunk`.
+        """
+        m = chunk << self.width | bit
+        return {name: bool(m >> i & 1) for i, name in enumerate(self.symbols)}
+
+
+def column(i, width):
+    """
+    Returns the bit vector over 2**width models with bit m set
+    exactly when bit i of m is set.
+    """
+    block = 1 << i
+    pattern = ((1 << block) - 1) << block
+    length = 2 * block
+    while length < 2 ** width:
+        pattern |= pattern << length
+        length *= 2
+    return pattern
+
+
+def model_check(knowledge, query):
+    """Checks if knowledge base entails query."""
+    program = Program([knowledge, query])
+    for chunk in range(program.chunks):
+        kb, q = program.run(chunk)
+        if kb & ~q:
+            return False
+    return True
@@ -0,0 +1,129 @@
+"""
+Random knights and knaves puzzles with known solutions.
+
+Each inhabitant is either a knight, who always tells the truth, or a knave,
+who always lies. A puzzle picks a hidden role for each inhabitant and has
+inhabitants make random nested statements about each other's roles that
+are consistent with those roles, until the roles are the only solution.
+"""
+
+import json
+import random
+import sys
+
+from logic import *
+import parse
+from session import Session
+
+
+class Puzzle():
+    """
+    A generated puzzle: `knowledge` encodes the rules and statements,
+    `truth` maps every symbol name to its value in the hidden solution.
+    """
+
+    def __init__(self, knowledge, truth, statements, unique):
+        self.knowledge = knowledge
+        self.truth = truth
+        self.statements = statements ## number of statements made
+        self.unique = unique ## True if the solution is the only one
+        self.symbols = [Symbol(name) for name in sorted(truth)]
+
+    def to_json(self):
+        return json.dumps({
+            "knowledge": parse.dumps(self.knowledge),
+            "truth": self.truth,
+            "statements": self.statements,
+            "unique": self.unique,
+        }, ensure_ascii=False)
+
+    @classmethod
+    def from_json(cls, line):
+        data = json.loads(line)
+        return cls(parse.loads(data["knowledge"]), data["truth"],
+                   data["statements"], data["unique"])
+
+
+def statement(rng, knights, knaves, depth):
+    """
+    Returns a random claim about the roles of inhabitants, nested up to
+    `depth` connectives deep.
+    """
+    if depth == 0 or rng.random() < 0.3:
+        person = rng.randrange(len(knights))
+        return knights[person] if rng.random() < 0.5 else knaves[person]
+    kind = rng.randrange(5)
+    if kind == 0:
+        return Not(statement(rng, knights, knaves, depth - 1))
+    if kind in (1, 2):
+        parts = [statement(rng, knights, knaves, depth - 1)
+                 for _ in range(rng.randint(2, 3))]
+        return And(*parts) if kind == 1 else Or(*parts)
+    if kind == 3:
+        return Implication(statement(rng, knights, knaves, depth - 1),
+                           statement(rng, knights, knaves, depth - 1))
+    return Biconditional(statement(rng, knights, knaves, depth - 1),
+                         statement(rng, knights, knaves, depth - 1))
+
+
+def generate(inhabitants, depth=2, seed=None, max_statements=None):
+    """
+    Returns a Puzzle with `inhabitants` people (2 symbols each) whose
+    statements are nested up to `depth` connectives deep. Statements are
+    added until the hidden roles are entailed, or `max_statements` is reached.
+    """
+    rng = random.Random(seed)
+    knights = [Symbol(f"{person_name(i)} is a Knight") for i in range(inhabitants)]
+    knaves = [Symbol(f"{person_name(i)} is a Knave") for i in range(inhabitants)]
+    truth = dict()
+    knowledge = And()
+    for knight, knave in zip(knights, knaves):
+        is_knight = rng.random() < 0.5
+        truth[knight.name] = is_knight
+        truth[knave.name] = not is_knight
+        ## everyone is a knight or a knave, but not both
+        knowledge.add(And(Or(knight, knave), Not(And(knight, knave))))
+    if max_statements is None:
+        max_statements = 4 * inhabitants
+    statements = 0
+    unknown = list(range(inhabitants))
+    while unknown and statements < max_statements:
+        ## a few statements at a time between uniqueness checks
+        for _ in range(max(1, inhabitants // 4)):
+            speaker = rng.randrange(inhabitants)
+            claim = statement(rng, knights, knaves, depth)
+            if claim.evaluate(truth) != truth[knights[speaker].name]:
+                claim = Not(claim)
+            ## a knight's claims are true, a knave's are false
+            knowledge.add(Biconditional(knights[speaker], claim))
+            statements += 1
+        session = Session(knowledge, engine="sat")
+        unknown = [i for i in unknown
+                   if not session.entails(knights[i] if truth[knights[i].name] else knaves[i])]
+    return Puzzle(knowledge, truth, statements, not unknown)
+
+
+def person_name(i):
+    """
+    Returns "A", "B", ..., "Z", "AA", "AB", ... for i = 0, 1, ...
+    """
+    name = ""
+    i += 1
+    while i:
+        i, r = divmod(i - 1, 26)
+        name = chr(ord("A") + r) + name
+    return name
+
+
+def main():
+    if len(sys.argv) not in [3, 4, 5]:
+        sys.exit("Usage: python generate.py inhabitants count [depth] [seed]")
+    inhabitants, count = int(sys.argv[1]), int(sys.argv[2])
+    depth = int(sys.argv[3]) if len(sys.argv) > 3 else 2
+    seed = int(sys.argv[4]) if len(sys.argv) > 4 else 0
+    for n in range(count):
+        print(generate(inhabitants, depth, seed=seed + n).to_json())
+
+
+if __name__ == "__main__":
+    main()
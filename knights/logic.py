@@ -1,7 +1,25 @@
 import itertools
+import weakref
 
 
 class Sentence():
+    __slots__ = ("cached_hash", "cached_symbols", "interned", "__weakref__")
+
+    def __init__(self):
+        self.cached_hash = None ## cached hash, None until first computed
+        self.cached_symbols = None ## cached frozenset of symbol names
+        self.interned = False ## True for the shared nodes returned by intern()
+
+    def __hash__(self):
+        if self.cached_hash is None:
+            if isinstance(self, COMPOUND):
+                fill_hashes(self)
+            else:
+                self.cached_hash = self.compute_hash()
+        return self.cached_hash
+
+    def compute_hash(self):
+        return hash(("sentence", id(self)))
 
     def evaluate(self, model):
         """Evaluates the logical sentence."""
@@ -13,7 +31,30 @@ class Sentence():
 
     def symbols(self):
         """Returns a set of all symbols in the logical sentence."""
-        return set()
+        return set(symbol_names(self))
+
+    def compute_symbols(self):
+        return frozenset()
+
+    def symbol_set(self):
+        """Returns the cached frozenset of all symbols, without copying."""
+        if self.cached_symbols is None:
+            if isinstance(self, COMPOUND):
+                symbol_names(self)
+            else:
+                self.cached_symbols = self.compute_symbols()
+        return self.cached_symbols
+
+    def forget(self):
+        """
+        Drops cached values after an in-place change. Sentences that contain
+        this one keep their own cached values, so only change sentences
+        that are not yet part of another sentence.
+        """
+        if self.interned:
+            raise TypeError("cannot modify an interned sentence")
+        self.cached_hash = None
+        self.cached_symbols = None
 
     @classmethod
     def validate(cls, sentence):
@@ -43,14 +84,18 @@ class Sentence():
 
 
 class Symbol(Sentence):
+    __slots__ = ("name",)
 
     def __init__(self, name):
+        super().__init__()
         self.name = name
 
     def __eq__(self, other):
         return isinstance(other, Symbol) and self.name == other.name
 
-    def __hash__(self):
+    __hash__ = Sentence.__hash__
+
+    def compute_hash(self):
         return hash(("symbol", self.name))
 
     def __repr__(self):
@@ -65,44 +110,54 @@ class Symbol(Sentence):
     def formula(self):
         return self.name
 
-    def symbols(self):
-        return {self.name}
+    def compute_symbols(self):
+        return frozenset((self.name,))
 
 
 class Not(Sentence):
+    __slots__ = ("operand",)
+
     def __init__(self, operand):
+        super().__init__()
         Sentence.validate(operand)
         self.operand = operand
 
     def __eq__(self, other):
-        return isinstance(other, Not) and self.operand == other.operand
+        return isinstance(other, Not) and equal(self, other)
 
-    def __hash__(self):
+    __hash__ = Sentence.__hash__
+
+    def compute_hash(self):
         return hash(("not", hash(self.operand)))
 
     def __repr__(self):
         return f"Not({self.operand})"
 
     def evaluate(self, model):
-        return not self.operand.evaluate(model)
+        return evaluate(self, model)
 
     def formula(self):
         return "¬" + Sentence.parenthesize(self.operand.formula())
 
-    def symbols(self):
-        return self.operand.symbols()
+    def compute_symbols(self):
+        return self.operand.symbol_set()
 
 
 class And(Sentence):
+    __slots__ = ("conjuncts",)
+
     def __init__(self, *conjuncts):
+        super().__init__()
         for conjunct in conjuncts:
             Sentence.validate(conjunct)
         self.conjuncts = list(conjuncts)
 
     def __eq__(self, other):
-        return isinstance(other, And) and self.conjuncts == other.conjuncts
+        return isinstance(other, And) and equal(self, other)
 
-    def __hash__(self):
+    __hash__ = Sentence.__hash__
+
+    def compute_hash(self):
         return hash(
             ("and", tuple(hash(conjunct) for conjunct in self.conjuncts))
         )
@@ -115,10 +170,11 @@ class And(Sentence):
 
     def add(self, conjunct):
         Sentence.validate(conjunct)
+        self.forget()
         self.conjuncts.append(conjunct)
 
     def evaluate(self, model):
-        return all(conjunct.evaluate(model) for conjunct in self.conjuncts)
+        return evaluate(self, model)
 
     def formula(self):
         if len(self.conjuncts) == 1:
@@ -126,20 +182,26 @@ class And(Sentence):
         return " ∧ ".join([Sentence.parenthesize(conjunct.formula())
                            for conjunct in self.conjuncts])
 
-    def symbols(self):
-        return set.union(*[conjunct.symbols() for conjunct in self.conjuncts])
+    def compute_symbols(self):
+        return frozenset().union(
+            *[conjunct.symbol_set() for conjunct in self.conjuncts])
 
 
 class Or(Sentence):
+    __slots__ = ("disjuncts",)
+
     def __init__(self, *disjuncts):
+        super().__init__()
         for disjunct in disjuncts:
             Sentence.validate(disjunct)
         self.disjuncts = list(disjuncts)
 
     def __eq__(self, other):
-        return isinstance(other, Or) and self.disjuncts == other.disjuncts
+        return isinstance(other, Or) and equal(self, other)
 
-    def __hash__(self):
+    __hash__ = Sentence.__hash__
+
+    def compute_hash(self):
         return hash(
             ("or", tuple(hash(disjunct) for disjunct in self.disjuncts))
         )
@@ -149,7 +211,7 @@ class Or(Sentence):
         return f"Or({disjuncts})"
 
     def evaluate(self, model):
-        return any(disjunct.evaluate(model) for disjunct in self.disjuncts)
+        return evaluate(self, model)
 
     def formula(self):
         if len(self.disjuncts) == 1:
@@ -157,107 +219,326 @@ class Or(Sentence):
         return " ∨  ".join([Sentence.parenthesize(disjunct.formula())
                             for disjunct in self.disjuncts])
 
-    def symbols(self):
-        return set.union(*[disjunct.symbols() for disjunct in self.disjuncts])
+    def compute_symbols(self):
+        return frozenset().union(
+            *[disjunct.symbol_set() for disjunct in self.disjuncts])
 
 
 class Implication(Sentence):
+    __slots__ = ("antecedent", "consequent")
+
     def __init__(self, antecedent, consequent):
+        super().__init__()
         Sentence.validate(antecedent)
         Sentence.validate(consequent)
         self.antecedent = antecedent
         self.consequent = consequent
 
     def __eq__(self, other):
-        return (isinstance(other, Implication)
-                and self.antecedent == other.antecedent
-                and self.consequent == other.consequent)
+        return isinstance(other, Implication) and equal(self, other)
 
-    def __hash__(self):
+    __hash__ = Sentence.__hash__
+
+    def compute_hash(self):
         return hash(("implies", hash(self.antecedent), hash(self.consequent)))
 
     def __repr__(self):
         return f"Implication({self.antecedent}, {self.consequent})"
 
     def evaluate(self, model):
-        return ((not self.antecedent.evaluate(model))
-                or self.consequent.evaluate(model))
+        return evaluate(self, model)
 
     def formula(self):
         antecedent = Sentence.parenthesize(self.antecedent.formula())
         consequent = Sentence.parenthesize(self.consequent.formula())
         return f"{antecedent} => {consequent}"
 
-    def symbols(self):
-        return set.union(self.antecedent.symbols(), self.consequent.symbols())
+    def compute_symbols(self):
+        return self.antecedent.symbol_set() | self.consequent.symbol_set()
 
 
 class Biconditional(Sentence):
+    __slots__ = ("left", "right")
+
     def __init__(self, left, right):
+        super().__init__()
         Sentence.validate(left)
         Sentence.validate(right)
         self.left = left
         self.right = right
 
     def __eq__(self, other):
-        return (isinstance(other, Biconditional)
-                and self.left == other.left
-                and self.right == other.right)
+        return isinstance(other, Biconditional) and equal(self, other)
 
-    def __hash__(self):
+    __hash__ = Sentence.__hash__
+
+    def compute_hash(self):
         return hash(("biconditional", hash(self.left), hash(self.right)))
 
     def __repr__(self):
         return f"Biconditional({self.left}, {self.right})"
 
     def evaluate(self, model):
-        return ((self.left.evaluate(model)
-                 and self.right.evaluate(model))
-                or (not self.left.evaluate(model)
-                    and not self.right.evaluate(model)))
+        return evaluate(self, model)
 
     def formula(self):
         left = Sentence.parenthesize(str(self.left))
         right = Sentence.parenthesize(str(self.right))
         return f"{left} <=> {right}"
 
-    def symbols(self):
-        return set.union(self.left.symbols(), self.right.symbols())
+    def compute_symbols(self):
+        return self.left.symbol_set() | self.right.symbol_set()
+
+
+## connectives whose cached values are filled bottom-up without recursion
+COMPOUND = (Not, And, Or, Implication, Biconditional)
+CONNECTIVES = (Symbol,) + COMPOUND
+
+
+def connective(sentence):
+    """
+    Returns the class among Symbol and the COMPOUND connectives that
+    `sentence` is an instance of, so subclasses are handled like their
+    base class, or None for other sentences.
+    """
+    kind = type(sentence)
+    if kind in CONNECTIVES:
+        return kind
+    for base in CONNECTIVES:
+        if isinstance(sentence, base):
+            return base
+    return None
+
+
+## Interned sentences, keyed by class and the identity of their interned
+## children (or the name of a symbol). Entries go away with their sentences.
+interned_sentences = weakref.WeakValueDictionary()
+
+
+def intern(sentence):
+    """
+    Returns the shared copy of `sentence`: structurally equal sentences are
+    interned to the same object, so a knowledge base becomes a DAG in which
+    each unique subformula exists once, and hashes and symbol sets are
+    computed once per unique subformula. Interned sentences must not be
+    changed (And.add raises TypeError).
+    """
+    done = dict() ## id(node) -> interned node
+    stack = [(sentence, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if id(node) in done:
+            continue
+        if node.interned or not isinstance(
+                node, (Symbol, Not, And, Or, Implication, Biconditional)):
+            done[id(node)] = node
+            continue
+        if isinstance(node, Symbol):
+            key = (Symbol, node.name)
+            children = []
+        else:
+            children = subsentences(node)
+            if not expanded:
+                stack.append((node, True))
+                stack.extend((child, False) for child in children)
+                continue
+            children = [done[id(child)] for child in children]
+            key = (type(node), tuple(id(child) for child in children))
+        shared = interned_sentences.get(key)
+        if shared is None:
+            if isinstance(node, Symbol):
+                shared = Symbol(node.name)
+            else:
+                shared = type(node)(*children)
+            shared.interned = True
+            interned_sentences[key] = shared
+        done[id(node)] = shared
+    return done[id(sentence)]
+
+
+def subsentences(sentence):
+    """
+    Returns the list of direct subsentences of `sentence`.
+    """
+    if isinstance(sentence, Not):
+        return [sentence.operand]
+    if isinstance(sentence, And):
+        return sentence.conjuncts
+    if isinstance(sentence, Or):
+        return sentence.disjuncts
+    if isinstance(sentence, Implication):
+        return [sentence.antecedent, sentence.consequent]
+    if isinstance(sentence, Biconditional):
+        return [sentence.left, sentence.right]
+    return []
+
+
+def evaluate(sentence, model):
+    """
+    Evaluates `sentence` in `model` with an explicit stack instead of
+    recursion, so formulas of any depth can be evaluated. Short-circuits
+    like the recursive definitions: And stops at the first false conjunct,
+    Or at the first true disjunct, Implication skips its consequent when
+    the antecedent is false. Subclasses of the connectives are evaluated
+    like their base class; other Sentence subclasses are asked to evaluate
+    themselves.
+    """
+    stack = [[sentence, 0, None]] ## [node, next child, left value]
+    value = None ## value of the most recently finished node
+    while stack:
+        frame = stack[-1]
+        node, i = frame[0], frame[1]
+        kind = connective(node)
+        if kind is Symbol:
+            try:
+                value = bool(model[node.name])
+            except KeyError:
+                raise Exception(f"variable {node.name} not in model")
+        elif kind is Not:
+            if i == 0:
+                frame[1] = 1
+                stack.append([node.operand, 0, None])
+                continue
+            value = not value
+        elif kind is And or kind is Or:
+            children = node.conjuncts if kind is And else node.disjuncts
+            if i == 0:
+                value = kind is And
+            ## And is done at the first false child, Or at the first true one
+            if i < len(children) and value == (kind is And):
+                frame[1] = i + 1
+                stack.append([children[i], 0, None])
+                continue
+        elif kind is Implication:
+            if i == 0:
+                frame[1] = 1
+                stack.append([node.antecedent, 0, None])
+                continue
+            if i == 1:
+                if value:
+                    frame[1] = 2
+                    stack.append([node.consequent, 0, None])
+                    continue
+                value = True
+        elif kind is Biconditional:
+            if i == 0:
+                frame[1] = 1
+                stack.append([node.left, 0, None])
+                continue
+            if i == 1:
+                frame[1] = 2
+                frame[2] = value
+                stack.append([node.right, 0, None])
+                continue
+            value = frame[2] == value
+        else:
+            value = node.evaluate(model)
+        stack.pop()
+    return value
+
+
+def symbol_names(sentence):
+    """
+    Returns the set of all symbols in `sentence`. Fills the cached symbol
+    sets bottom-up with an explicit stack, so no call recurses more than
+    one level into the sentence.
+    """
+    names = set()
+    stack = [(sentence, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if not isinstance(node, CONNECTIVES):
+            if type(node).symbols is Sentence.symbols:
+                names.update(node.symbol_set())
+            else:
+                names.update(node.symbols())
+        elif node.cached_symbols is not None:
+            names.update(node.cached_symbols)
+        elif expanded or isinstance(node, Symbol):
+            ## the children's symbol sets are cached by now
+            node.cached_symbols = node.compute_symbols()
+            names.update(node.cached_symbols)
+        else:
+            stack.append((node, True))
+            stack.extend((child, False) for child in subsentences(node))
+    return names
+
+
+def equal(left, right):
+    """
+    Returns whether two sentences are structurally equal, comparing their
+    subsentences with an explicit stack. Distinct interned sentences are
+    never equal, so they are not compared further. Cached hashes are not
+    used: a sentence containing one changed by And.add keeps a stale hash.
+    """
+    stack = [(left, right)]
+    while stack:
+        a, b = stack.pop()
+        if a is b:
+            continue
+        if not isinstance(a, COMPOUND):
+            if a != b:
+                return False
+            continue
+        if not isinstance(b, connective(a)) or (a.interned and b.interned):
+            return False
+        children, others = subsentences(a), subsentences(b)
+        if len(children) != len(others):
+            return False
+        stack.extend(zip(children, others))
+    return True
+
+
+def fill_hashes(sentence):
+    """
+    Computes and caches the hash of `sentence` and of its subsentences
+    bottom-up with an explicit stack, so no hash computation recurses
+    more than one level into the sentence.
+    """
+    stack = [(sentence, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if not isinstance(node, COMPOUND):
+            hash(node)
+        elif node.cached_hash is not None:
+            continue
+        elif expanded:
+            ## the children's hashes are cached by now
+            node.cached_hash = node.compute_hash()
+        else:
+            stack.append((node, True))
+            stack.extend((child, False) for child in subsentences(node))
+
+
+def gray_code(symbols, model):
+    """
+    Enumerates every assignment to `symbols` in Gray-code order, so each
+    model differs from the one before in a single symbol. The dict `model`
+    is changed in place and yielded each time; afterwards every symbol is
+    back to False (the last Gray code flips only the first bit).
+    """
+    for symbol in symbols:
+        model[symbol] = False
+    yield model
+    for step in range(1, 2 ** len(symbols)):
+        ## the bit to flip is the lowest set bit of the step number
+        symbol = symbols[(step & -step).bit_length() - 1]
+        model[symbol] = not model[symbol]
+        yield model
+    if symbols:
+        model[symbols[-1]] = False
 
 
 def model_check(knowledge, query):
     """Checks if knowledge base entails query."""
 
-    def check_all(knowledge, query, symbols, model):
-        """Checks if knowledge base entails query, given a particular model."""
-
-        # If model has an assignment for each symbol
-        if not symbols:
-
-            # If knowledge base is true in model, then query must also be true
-            if knowledge.evaluate(model):
-                return query.evaluate(model)
-            return True
-        else:
-
-            # Choose one of the remaining unused symbols
-            remaining = symbols.copy()
-            p = remaining.pop()
-
-            # Create a model where the symbol is true
-            model_true = model.copy()
-            model_true[p] = True
-
-            # Create a model where the symbol is false
-            model_false = model.copy()
-            model_false[p] = False
-
-            # Ensure entailment holds in both models
-            return (check_all(knowledge, query, remaining, model_true) and
-                    check_all(knowledge, query, remaining, model_false))
-
     # Get all symbols in both knowledge and query
-    symbols = set.union(knowledge.symbols(), query.symbols())
-
-    # Check that knowledge entails query
-    return check_all(knowledge, query, symbols, dict())
+    symbols = sorted(symbol_names(knowledge) | symbol_names(query))
+
+    # Walk all models in one dict, changing a single symbol per step;
+    # entailment fails at the first model where knowledge holds but
+    # query does not
+    for model in gray_code(symbols, dict()):
+        if evaluate(knowledge, model) and not evaluate(query, model):
+            return False
+    return True
@@ -0,0 +1,211 @@
+"""
+Model counting and lazy model enumeration for logic.py sentences.
+
+Both work on the Tseitin CNF of a sentence (see sat.py). Every Tseitin
+variable is defined as equivalent to its subsentence, so each model of the
+sentence extends to exactly one model of the CNF, and unit propagation
+fixes the Tseitin variables once the symbols below them are assigned.
+"""
+
+import itertools
+
+from logic import *
+import sat
+
+
+def clause_set(sentence):
+    """
+    Returns (cnf, clauses) for `sentence`, with the clauses as a frozenset of
+    frozensets of literals, tautological clauses removed.
+    """
+    cnf = sat.CNF()
+    cnf.add(sentence)
+    clauses = set()
+    for clause in cnf.clauses:
+        clause = frozenset(clause)
+        if not any(-lit in clause for lit in clause):
+            clauses.add(clause)
+    return cnf, frozenset(clauses)
+
+
+def condition(clauses, literals):
+    """
+    Makes every literal in `literals` true, then unit propagates.
+    Returns (clauses, assigned) where assigned is the set of literals made
+    true, or (None, None) on a conflict.
+    """
+    if frozenset() in clauses:
+        return None, None
+    assigned = set()
+    pending = list(literals)
+    clauses = set(clauses)
+    while pending:
+        lit = pending.pop()
+        if lit in assigned:
+            continue
+        if -lit in assigned:
+            return None, None
+        assigned.add(lit)
+        reduced = set()
+        for clause in clauses:
+            if lit in clause:
+                continue
+            if -lit in clause:
+                clause = clause - {-lit}
+                if not clause:
+                    return None, None
+                if len(clause) == 1:
+                    pending.extend(clause)
+            reduced.add(clause)
+        clauses = reduced
+    ## drop unit clauses already satisfied by the assignment
+    clauses = frozenset(c for c in clauses if not (c & assigned))
+    return clauses, assigned
+
+
+def variables(clauses):
+    return {abs(lit) for clause in clauses for lit in clause}
+
+
+def components(clauses):
+    """
+    Splits clauses into groups that share no variables.
+    """
+    parent = dict()
+    def find(v):
+        while parent[v] != v:
+            parent[v] = parent[parent[v]]
+            v = parent[v]
+        return v
+    for clause in clauses:
+        vs = [abs(lit) for lit in clause]
+        for v in vs:
+            parent.setdefault(v, v)
+        root = find(vs[0])
+        for v in vs[1:]:
+            parent[find(v)] = root
+    groups = dict()
+    for clause in clauses:
+        groups.setdefault(find(abs(next(iter(clause)))), []).append(clause)
+    return [frozenset(group) for group in groups.values()]
+
+
+class Counter():
+    """
+    Exact model counter: unit propagation, branching on the most frequent
+    variable, splitting into independent components, and caching the count
+    of every component seen.
+    """
+
+    def __init__(self):
+        self.cache = dict() ## component -> number of models over its variables
+        self.hits = 0
+
+    def count(self, clauses):
+        """
+        Returns the number of models of `clauses` over exactly their variables.
+        """
+        total = 1
+        for component in components(clauses):
+            total *= self.count_component(component)
+            if total == 0:
+                break
+        return total
+
+    def count_component(self, clauses):
+        if clauses in self.cache:
+            self.hits += 1
+            return self.cache[clauses]
+        occurrences = dict()
+        for clause in clauses:
+            for lit in clause:
+                occurrences[abs(lit)] = occurrences.get(abs(lit), 0) + 1
+        var = max(occurrences, key=occurrences.get)
+        total = 0
+        for lit in (var, -var):
+            reduced, assigned = condition(clauses, [lit])
+            if reduced is None:
+                continue
+            ## variables that dropped out without being assigned are free
+            free = len(occurrences) - len(assigned) - len(variables(reduced))
+            total += 2 ** free * self.count(reduced)
+        self.cache[clauses] = total
+        return total
+
+
+def count_models(knowledge, symbols=None):
+    """
+    Returns the number of models of `knowledge` over `symbols` (the names of
+    the symbols in `knowledge` by default; extra names are unconstrained).
+    """
+    if symbols is None:
+        symbols = knowledge.symbols()
+    cnf, clauses = clause_set(knowledge)
+    extra = set(symbols) - set(cnf.variables)
+    missing = set(cnf.variables) - set(symbols)
+    if missing:
+        raise ValueError(f"symbols {sorted(missing)} of the sentence are not counted")
+    units = [next(iter(c)) for c in clauses if len(c) == 1]
+    reduced, assigned = condition(clauses, units)
+    if reduced is None:
+        return 0
+    free = cnf.num_vars - len(assigned) - len(variables(reduced))
+    return 2 ** (free + len(extra)) * Counter().count(reduced)
+
+
+def iter_models(knowledge, symbols=None):
+    """
+    Yields the models of `knowledge` one at a time, as dicts mapping each
+    symbol name in `symbols` (those of `knowledge` by default) to a bool.
+    Branches only on symbols, pruning any partial assignment that unit
+    propagation refutes, so the 2**n assignments are never all built.
+    """
+    if symbols is None:
+        symbols = knowledge.symbols()
+    cnf, clauses = clause_set(knowledge)
+    names = sorted(symbols)
+    var = {name: cnf.variables.get(name) for name in names}
+    units = [next(iter(c)) for c in clauses if len(c) == 1]
+    clauses, assigned = condition(clauses, units)
+    if clauses is None:
+        return
+    stack = [(clauses, assigned, dict(), 0)]
+    while stack:
+        clauses, assigned, model, k = stack.pop()
+        ## take every symbol that propagation has already fixed
+        while k < len(names):
+            v = var[names[k]]
+            if v is None or (v not in assigned and -v not in assigned):
+                break
+            model = dict(model)
+            model[names[k]] = v in assigned
+            k += 1
+        if k == len(names):
+            yield model
+            continue
+        if not clauses:
+            ## every clause is satisfied, the unassigned symbols are free
+            fixed = dict(model)
+            rest = []
+            for name in names[k:]:
+                v = var[name]
+                if v is not None and (v in assigned or -v in assigned):
+                    fixed[name] = v in assigned
+                else:
+                    rest.append(name)
+            for values in itertools.product((False, True), repeat=len(rest)):
+                full = dict(fixed)
+                full.update(zip(rest, values))
+                yield full
+            continue
+        name = names[k]
+        v = var[name]
+        if v is None:
+            ## symbol not in the knowledge base
+            for value in (True, False):
+                stack.append((clauses, assigned, {**model, name: value}, k + 1))
+            continue
+        for lit in (-v, v): ## pushed so that True is tried first
+            reduced, more = condition(clauses, [lit])
+            if reduced is not None:
+                stack.append((reduced, assigned | more, dict(model), k))
@@ -0,0 +1,74 @@
+"""
+Parallel truth-table entailment for logic.py sentences.
+
+The 2**n models are split into 2**k cubes by fixing the values of k
+symbols. Each cube is checked with the bit-parallel evaluator of
+compiled.py in a process pool, and all workers stop as soon as one of
+them finds a model of the knowledge base in which the query is false.
+"""
+
+import multiprocessing
+import os
+
+from logic import *
+import compiled
+import parse
+
+## per-process state of a worker, set by init_worker
+program = None
+found = None
+
+
+def init_worker(text, event):
+    """
+    Compiles the knowledge base and query once per worker process.
+    They arrive as parse.dumps text, which pickles without recursion.
+    """
+    global program, found
+    knowledge, query = loads_pair(text)
+    program = compiled.Program([knowledge, query])
+    found = event
+
+
+def loads_pair(text):
+    pair = parse.loads(text)
+    return pair.conjuncts[0], pair.conjuncts[1]
+
+
+def check_cube(cube):
+    """
+    Returns False if chunks cube[0] up to cube[1] contain a counter-model,
+    True if they do not, or None if another worker found one first.
+    """
+    for chunk in range(*cube):
+        if found.is_set():
+            return None
+        kb, q = program.run(chunk)
+        if kb & ~q:
+            found.set()
+            return False
+    return True
+
+
+def model_check(knowledge, query, processes=None, cubes_per_process=4):
+    """Checks if knowledge base entails query."""
+    processes = processes or os.cpu_count()
+    serial = compiled.Program([knowledge, query])
+    ## the symbols that vary between chunks are the ones fixed by a cube;
+    ## use about cubes_per_process cubes per worker
+    fixed = 0
+    while 2 ** fixed < processes * cubes_per_process and 2 ** fixed < serial.chunks:
+        fixed += 1
+    if processes == 1 or fixed == 0:
+        return compiled.model_check(knowledge, query)
+    step = serial.chunks // 2 ** fixed
+    cubes = [(start, start + step) for start in range(0, serial.chunks, step)]
+    text = parse.dumps(And(knowledge, query))
+    event = multiprocessing.Event()
+    with multiprocessing.Pool(processes, initializer=init_worker,
+                              initargs=(text, event)) as pool:
+        for result in pool.imap_unordered(check_cube, cubes):
+            if result is False:
+                pool.terminate()
+                return False
+    return True
@@ -0,0 +1,232 @@
+"""
+Reading and writing logic.py sentences as text.
+
+Formulas use the syntax of Sentence.formula(): ¬ (also ~ or !), ∧ (&),
+∨ (|), => and <=>, with parentheses; ⊤ and ⊥ stand for And() and Or().
+Binding is tightest for ¬, then ∧, ∨, =>, <=>; => groups to the right.
+Symbol names are whatever text lies between operators, so names with
+spaces such as "A is a Knight" need no quoting.
+
+For large knowledge bases, `dumps`/`loads` use a flat JSON list of nodes
+in which every node refers to earlier nodes by index, so shared
+subformulas are stored once and nothing is nested.
+"""
+
+import json
+import re
+
+from logic import *
+
+TOKENS = {
+    "¬": "not", "~": "not", "!": "not",
+    "∧": "and", "&": "and",
+    "∨": "or", "|": "or",
+    "=>": "implies", "<=>": "iff",
+    "(": "(", ")": ")",
+    "⊤": "true", "⊥": "false",
+}
+## binding strength of binary operators
+PRECEDENCE = {"and": 4, "or": 3, "implies": 2, "iff": 1}
+RIGHT = {"implies"}
+SPECIAL = set("¬~!∧&∨|()⊤⊥<=")
+TOKEN = re.compile(r"<=>|=>|[¬~!∧&∨|()⊤⊥]|[^¬~!∧&∨|()⊤⊥<=]+")
+
+
+def tokenize(text):
+    """
+    Returns the list of (kind, value) tokens of `text` in one pass.
+    """
+    tokens = []
+    position = 0
+    for match in TOKEN.finditer(text):
+        if match.start() != position:
+            raise ValueError(f"unexpected {text[position]!r} at position {position}")
+        position = match.end()
+        token = match.group()
+        if token in TOKENS:
+            tokens.append((TOKENS[token], None))
+        elif token.strip():
+            tokens.append(("name", token.strip()))
+    if position != len(text):
+        raise ValueError(f"unexpected {text[position]!r} at position {position}")
+    return tokens
+
+
+def parse(text):
+    """
+    Returns the Sentence written in `text`. Runs in time linear in the
+    length of `text`, without recursion, so nesting depth is not limited.
+    """
+    symbols = dict() ## name -> Symbol, so each symbol is created once
+    operands = []
+    operators = [] ## "not", "(", or binary operator names
+    sealed = set() ## ids of And/Or closed by a parenthesis, never extended
+
+    def reduce():
+        op = operators.pop()
+        if op == "not":
+            operands.append(Not(operands.pop()))
+            return
+        if len(operands) < 2:
+            raise ValueError("missing operand")
+        right = operands.pop()
+        left = operands.pop()
+        if op in ("and", "or"):
+            cls = And if op == "and" else Or
+            if type(left) is cls and id(left) not in sealed and (
+                    left.conjuncts if cls is And else left.disjuncts):
+                ## a ∧ b ∧ c is one And with three conjuncts
+                (left.conjuncts if cls is And else left.disjuncts).append(right)
+                operands.append(left)
+            else:
+                operands.append(cls(left, right))
+        elif op == "implies":
+            operands.append(Implication(left, right))
+        else:
+            operands.append(Biconditional(left, right))
+
+    expect_operand = True
+    for kind, value in tokenize(text):
+        if expect_operand:
+            if kind == "name":
+                if value not in symbols:
+                    symbols[value] = Symbol(value)
+                operands.append(symbols[value])
+                expect_operand = False
+            elif kind in ("true", "false"):
+                operands.append(And() if kind == "true" else Or())
+                expect_operand = False
+            elif kind in ("not", "("):
+                operators.append(kind)
+            else:
+                raise ValueError(f"expected an operand, found {kind}")
+        else:
+            if kind == ")":
+                while operators and operators[-1] != "(":
+                    reduce()
+                if not operators:
+                    raise ValueError("unbalanced parenthesis")
+                operators.pop()
+                sealed.add(id(operands[-1]))
+            elif kind in PRECEDENCE:
+                while operators and operators[-1] != "(" and (
+                        operators[-1] == "not"
+                        or PRECEDENCE[operators[-1]] > PRECEDENCE[kind]
+                        or (PRECEDENCE[operators[-1]] == PRECEDENCE[kind]
+                            and kind not in RIGHT)):
+                    reduce()
+                operators.append(kind)
+                expect_operand = True
+            else:
+                raise ValueError(f"expected an operator, found {kind}")
+        ## a negation applies to the operand just completed
+        while not expect_operand and operators and operators[-1] == "not":
+            reduce()
+    if expect_operand:
+        raise ValueError("unexpected end of formula")
+    while operators:
+        if operators[-1] == "(":
+            raise ValueError("unbalanced parenthesis")
+        reduce()
+    return operands[0]
+
+
+def to_formula(sentence):
+    """
+    Returns `sentence` written in the syntax read by `parse`, in time linear
+    in the size of the result. Every compound operand is parenthesized.
+    """
+    pieces = []
+    stack = [sentence]
+    while stack:
+        node = stack.pop()
+        if isinstance(node, str):
+            pieces.append(node)
+            continue
+        if isinstance(node, Symbol):
+            if not node.name or any(c in SPECIAL for c in node.name) \
+                    or node.name != node.name.strip():
+                raise ValueError(f"cannot write symbol name {node.name!r}")
+            pieces.append(node.name)
+            continue
+        if isinstance(node, And) and not node.conjuncts:
+            pieces.append("⊤")
+            continue
+        if isinstance(node, Or) and not node.disjuncts:
+            pieces.append("⊥")
+            continue
+        if isinstance(node, Not):
+            items, separator, prefix = [node.operand], "", "¬"
+        elif isinstance(node, And):
+            items, separator, prefix = node.conjuncts, " ∧ ", ""
+        elif isinstance(node, Or):
+            items, separator, prefix = node.disjuncts, " ∨ ", ""
+        elif isinstance(node, Implication):
+            items, separator, prefix = [node.antecedent, node.consequent], " => ", ""
+        elif isinstance(node, Biconditional):
+            items, separator, prefix = [node.left, node.right], " <=> ", ""
+        else:
+            raise TypeError("must be a logical sentence")
+        ## push in reverse so the pieces come out in order
+        work = [prefix]
+        for k, item in enumerate(items):
+            if k:
+                work.append(separator)
+            if isinstance(item, Symbol) or (len(items) == 1 and isinstance(item, Not)):
+                work.append(item)
+            else:
+                work.extend(["(", item, ")"])
+        stack.extend(reversed(work))
+    return "".join(pieces)
+
+
+## node kinds of the JSON format
+KINDS = {Not: "not", And: "and", Or: "or", Implication: "implies", Biconditional: "iff"}
+CLASSES = {kind: cls for cls, kind in KINDS.items()}
+
+
+def dumps(sentence):
+    """
+    Returns `sentence` as JSON: {"symbols": [names], "nodes": [[kind, args...]],
+    "root": index}. Index i < len(symbols) refers to a symbol, index
+    len(symbols) + k to node k. Subsentences shared by identity
+    (see logic.intern) are written once.
+    """
+    index = dict() ## id(node) -> index
+    names = []
+    nodes = []
+    postorder = []
+    stack = [(sentence, False)]
+    seen = set()
+    while stack:
+        node, expanded = stack.pop()
+        if expanded:
+            postorder.append(node)
+            continue
+        if id(node) in seen:
+            continue
+        seen.add(id(node))
+        if isinstance(node, Symbol):
+            index[id(node)] = len(names)
+            names.append(node.name)
+            continue
+        if type(node) not in KINDS:
+            raise TypeError("must be a logical sentence")
+        stack.append((node, True))
+        stack.extend((child, False) for child in reversed(subsentences(node)))
+    for node in postorder:
+        index[id(node)] = len(names) + len(nodes)
+        nodes.append([KINDS[type(node)]] + [index[id(child)] for child in subsentences(node)])
+    return json.dumps({"symbols": names, "nodes": nodes, "root": index[id(sentence)]},
+                      separators=(",", ":"), ensure_ascii=False)
+
+
+def loads(text):
+    """
+    Returns the sentence in a string written by `dumps`.
+    """
+    data = json.loads(text)
+    built = [Symbol(name) for name in data["symbols"]]
+    for kind, *args in data["nodes"]:
+        built.append(CLASSES[kind](*[built[a] for a in args]))
+    return built[data["root"]]
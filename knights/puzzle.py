@@ -1,4 +1,18 @@
+import sys
+
 from logic import *
+import compiled
+import sat
+from session import Session
+
+## entailment engines, all with the signature of model_check;
+## "session" answers all queries of a puzzle with one Session instead
+ENGINES = {
+    "session": None,
+    "truth-table": model_check,
+    "compiled": compiled.model_check,
+    "sat": sat.model_check,
+}
 
 AKnight = Symbol("A is a Knight")
 AKnave = Symbol("A is a Knave")
@@ -70,7 +84,7 @@ knowledge3 = And(
 
 
 
-def main():
+def main(check=None):
     symbols = [AKnight, AKnave, BKnight, BKnave, CKnight, CKnave]
     puzzles = [
         ("Puzzle 0", knowledge0),
@@ -83,10 +97,16 @@ def main():
         if len(knowledge.conjuncts) == 0:
             print("    Not yet implemented.")
         else:
-            for symbol in symbols:
-                if model_check(knowledge, symbol):
+            if check is None:
+                answers = Session(knowledge).entails_all(symbols)
+            else:
+                answers = [check(knowledge, symbol) for symbol in symbols]
+            for symbol, entailed in zip(symbols, answers):
+                if entailed:
                     print(f"    {symbol}")
 
 
 if __name__ == "__main__":
-    main()
+    if len(sys.argv) > 2 or (len(sys.argv) == 2 and sys.argv[1] not in ENGINES):
+        sys.exit(f"Usage: python puzzle.py [{'|'.join(ENGINES)}]")
+    main(ENGINES[sys.argv[1]] if len(sys.argv) == 2 else None)
@@ -0,0 +1,374 @@
+"""
+SAT-based entailment for the sentences of logic.py.
+
+Sentences are converted to CNF with the Tseitin transformation, which adds
+one variable per connective instead of distributing, so the CNF grows
+linearly with the sentence. Entailment KB ⊨ query is checked by asking a
+CDCL solver whether KB ∧ ¬query is unsatisfiable.
+"""
+
+import heapq
+
+from logic import *
+
+
+class CNF():
+    """
+    Clauses over integer variables 1, 2, ...; a literal is v or -v.
+    Symbols are mapped to variables by name, and every compound subsentence
+    gets a Tseitin variable equivalent to it.
+    """
+
+    def __init__(self):
+        self.variables = dict() ## symbol name -> variable
+        self.num_vars = 0
+        self.clauses = []
+        self.true = None ## literal fixed to true, for empty And/Or
+
+    def new_var(self):
+        self.num_vars += 1
+        return self.num_vars
+
+    def symbol(self, name):
+        """
+        Returns the variable of the symbol called `name`.
+        """
+        if name not in self.variables:
+            self.variables[name] = self.new_var()
+        return self.variables[name]
+
+    def constant(self, value):
+        if self.true is None:
+            self.true = self.new_var()
+            self.clauses.append([self.true])
+        return self.true if value else -self.true
+
+    def literal(self, sentence):
+        """
+        Returns a literal equivalent to `sentence`, adding the defining
+        clauses of any new Tseitin variables.
+        """
+        literals = dict() ## id(sentence) -> literal
+        stack = [(sentence, False)]
+        while stack:
+            node, expanded = stack.pop()
+            if id(node) in literals:
+                continue
+            if isinstance(node, Symbol):
+                literals[id(node)] = self.symbol(node.name)
+                continue
+            children = subsentences(node)
+            if not expanded:
+                stack.append((node, True))
+                stack.extend((child, False) for child in children)
+                continue
+            args = [literals[id(child)] for child in children]
+            if isinstance(node, Not):
+                literals[id(node)] = -args[0]
+            elif isinstance(node, And):
+                literals[id(node)] = self.define_and(args)
+            elif isinstance(node, Or):
+                literals[id(node)] = -self.define_and([-a for a in args])
+            elif isinstance(node, Implication):
+                literals[id(node)] = -self.define_and([args[0], -args[1]])
+            elif isinstance(node, Biconditional):
+                a, b = args
+                v = self.new_var()
+                self.clauses.extend([[-v, -a, b], [-v, a, -b],
+                                     [v, a, b], [v, -a, -b]])
+                literals[id(node)] = v
+            else:
+                raise TypeError("must be a logical sentence")
+        return literals[id(sentence)]
+
+    def define_and(self, args):
+        """
+        Returns a literal equivalent to the conjunction of literals `args`.
+        """
+        if not args:
+            return self.constant(True)
+        if len(args) == 1:
+            return args[0]
+        v = self.new_var()
+        for a in args:
+            self.clauses.append([-v, a])
+        self.clauses.append([v] + [-a for a in args])
+        return v
+
+    def add(self, sentence):
+        """
+        Asserts that `sentence` is true. Top-level conjunctions are split
+        into separate assertions and clauses are added directly where possible.
+        """
+        stack = [sentence]
+        while stack:
+            node = stack.pop()
+            if isinstance(node, And):
+                stack.extend(node.conjuncts)
+            elif isinstance(node, Or):
+                self.clauses.append([self.literal(d) for d in node.disjuncts])
+            elif isinstance(node, Implication):
+                self.clauses.append([-self.literal(node.antecedent),
+                                     self.literal(node.consequent)])
+            else:
+                self.clauses.append([self.literal(node)])
+
+
+class Solver():
+    """
+    CDCL SAT solver: two watched literals per clause, VSIDS branching with
+    phase saving, first-UIP clause learning and geometric restarts.
+    Clauses can be added between calls to `solve`, and `solve` accepts
+    assumption literals, so learned clauses carry over between queries.
+    """
+
+    def __init__(self, cnf=None):
+        self.clauses = []
+        self.watches = dict() ## literal -> indices of clauses watching it
+        self.value = [None] ## variable -> True, False or None
+        self.level = [0]
+        self.reason = [None] ## variable -> index of the clause that implied it
+        self.phase = [False]
+        self.activity = [0.0]
+        self.heap = []
+        self.bump = 1.0
+        self.trail = []
+        self.limits = [] ## trail length at the start of each decision level
+        self.head = 0 ## trail position of the next literal to propagate
+        self.ok = True ## False once the clauses are unsatisfiable
+        self.conflicts = 0
+        self.decisions = 0
+        self.propagations = 0
+        if cnf is not None:
+            self.add_clauses(cnf.clauses)
+
+    def ensure(self, var):
+        while len(self.value) <= var:
+            self.value.append(None)
+            self.level.append(0)
+            self.reason.append(None)
+            self.phase.append(False)
+            self.activity.append(0.0)
+            heapq.heappush(self.heap, (0.0, len(self.value) - 1))
+
+    def lit_value(self, lit):
+        value = self.value[abs(lit)]
+        if value is None:
+            return None
+        return value if lit > 0 else not value
+
+    def add_clauses(self, clauses):
+        """
+        Adds clauses (lists of literals). Returns False if the clauses are
+        now known to be unsatisfiable.
+        """
+        self.backtrack(0)
+        for clause in clauses:
+            if not self.ok:
+                break
+            clause = list(set(clause))
+            if any(-lit in clause for lit in clause):
+                continue
+            for lit in clause:
+                self.ensure(abs(lit))
+            ## drop literals false at level 0, skip clauses true at level 0
+            if any(self.lit_value(lit) is True for lit in clause):
+                continue
+            clause = [lit for lit in clause if self.lit_value(lit) is None]
+            if not clause:
+                self.ok = False
+            elif len(clause) == 1:
+                self.assign(clause[0], None)
+                self.ok = self.propagate() is None
+            else:
+                self.attach(clause)
+        return self.ok
+
+    def attach(self, clause):
+        self.clauses.append(clause)
+        index = len(self.clauses) - 1
+        self.watches.setdefault(clause[0], []).append(index)
+        self.watches.setdefault(clause[1], []).append(index)
+        return index
+
+    def assign(self, lit, reason):
+        var = abs(lit)
+        self.value[var] = lit > 0
+        self.level[var] = len(self.limits)
+        self.reason[var] = reason
+        self.trail.append(lit)
+
+    def propagate(self):
+        """
+        Unit propagation. Returns the index of a conflicting clause or None.
+        """
+        while self.head < len(self.trail):
+            false_lit = -self.trail[self.head]
+            self.head += 1
+            self.propagations += 1
+            watching = self.watches.get(false_lit, [])
+            kept = []
+            conflict = None
+            for n, index in enumerate(watching):
+                clause = self.clauses[index]
+                if clause[0] == false_lit:
+                    clause[0], clause[1] = clause[1], clause[0]
+                if self.lit_value(clause[0]) is True:
+                    kept.append(index)
+                    continue
+                ## look for a new literal to watch
+                for k in range(2, len(clause)):
+                    if self.lit_value(clause[k]) is not False:
+                        clause[1], clause[k] = clause[k], clause[1]
+                        self.watches.setdefault(clause[1], []).append(index)
+                        break
+                else:
+                    kept.append(index)
+                    if self.lit_value(clause[0]) is False:
+                        conflict = index
+                        kept.extend(watching[n+1:])
+                        break
+                    self.assign(clause[0], index)
+            self.watches[false_lit] = kept
+            if conflict is not None:
+                return conflict
+        return None
+
+    def analyze(self, conflict):
+        """
+        Returns (learned clause, backjump level) for a conflict, using the
+        first unique implication point. The asserting literal comes first.
+        """
+        current = len(self.limits)
+        learned = [None]
+        seen = set()
+        counter = 0
+        lit = None
+        index = len(self.trail) - 1
+        clause = self.clauses[conflict]
+        while True:
+            for q in clause:
+                if q == lit:
+                    continue
+                var = abs(q)
+                if var not in seen and self.level[var] > 0:
+                    seen.add(var)
+                    self.bump_activity(var)
+                    if self.level[var] == current:
+                        counter += 1
+                    else:
+                        learned.append(q)
+            while abs(self.trail[index]) not in seen:
+                index -= 1
+            lit = self.trail[index]
+            index -= 1
+            counter -= 1
+            if counter == 0:
+                break
+            clause = self.clauses[self.reason[abs(lit)]]
+        learned[0] = -lit
+        level = 0
+        if len(learned) > 1:
+            ## watch the literal of the highest remaining level second
+            best = max(range(1, len(learned)), key=lambda k: self.level[abs(learned[k])])
+            learned[1], learned[best] = learned[best], learned[1]
+            level = self.level[abs(learned[1])]
+        return learned, level
+
+    def bump_activity(self, var):
+        self.activity[var] += self.bump
+        if self.activity[var] > 1e100:
+            self.activity = [a * 1e-100 for a in self.activity]
+            self.bump *= 1e-100
+            self.heap = [(-self.activity[v], v) for v in range(1, len(self.value))]
+            heapq.heapify(self.heap)
+        heapq.heappush(self.heap, (-self.activity[var], var))
+
+    def backtrack(self, level):
+        if len(self.limits) <= level:
+            return
+        for lit in self.trail[self.limits[level]:]:
+            var = abs(lit)
+            self.phase[var] = self.value[var]
+            self.value[var] = None
+            self.reason[var] = None
+            heapq.heappush(self.heap, (-self.activity[var], var))
+        del self.trail[self.limits[level]:]
+        del self.limits[level:]
+        self.head = len(self.trail)
+
+    def pick_branch(self):
+        """
+        Returns the unassigned variable of highest activity, or None.
+        """
+        while self.heap:
+            activity, var = heapq.heappop(self.heap)
+            if self.value[var] is None and -activity == self.activity[var]:
+                return var
+        for var in range(1, len(self.value)):
+            if self.value[var] is None:
+                return var
+        return None
+
+    def solve(self, assumptions=()):
+        """
+        Returns True if the clauses are satisfiable with every literal in
+        `assumptions` true, False otherwise. After True, `model` holds the
+        satisfying assignment.
+        """
+        if not self.ok:
+            return False
+        for lit in assumptions:
+            self.ensure(abs(lit))
+        self.backtrack(0)
+        if self.propagate() is not None:
+            self.ok = False
+            return False
+        restart = 100
+        since_restart = 0
+        while True:
+            conflict = self.propagate()
+            if conflict is not None:
+                self.conflicts += 1
+                since_restart += 1
+                if not self.limits:
+                    self.ok = False
+                    return False
+                learned, level = self.analyze(conflict)
+                self.backtrack(level)
+                if len(learned) == 1:
+                    self.assign(learned[0], None)
+                else:
+                    self.assign(learned[0], self.attach(learned))
+                self.bump /= 0.95
+                if since_restart >= restart:
+                    since_restart = 0
+                    restart = int(restart * 1.5)
+                    self.backtrack(0)
+                continue
+            if len(self.limits) < len(assumptions):
+                lit = assumptions[len(self.limits)]
+                value = self.lit_value(lit)
+                if value is False:
+                    self.backtrack(0)
+                    return False
+                self.limits.append(len(self.trail))
+                if value is None:
+                    self.assign(lit, None)
+                continue
+            var = self.pick_branch()
+            if var is None:
+                self.model = list(self.value)
+                self.backtrack(0)
+                return True
+            self.decisions += 1
+            self.limits.append(len(self.trail))
+            self.assign(var if self.phase[var] else -var, None)
+
+
+def model_check(knowledge, query):
+    """Checks if knowledge base entails query."""
+    cnf = CNF()
+    cnf.add(knowledge)
+    cnf.add(Not(query))
+    return not Solver(cnf).solve()
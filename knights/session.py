@@ -0,0 +1,103 @@
+"""
+Answer many entailment queries against one knowledge base.
+"""
+
+from logic import *
+import compiled
+import sat
+from simplify import simplify, size
+
+MODELS_LIMIT = 20 ## knowledge bases with at most this many symbols keep their models
+
+
+class Session():
+    """
+    Compiles a knowledge base once, then answers entailment queries against it.
+
+    With engine "models" the satisfying models of the knowledge base are
+    computed once as bit vectors (see compiled.py), and a batch of queries is
+    checked against them in a single pass.
+    With engine "sat" the knowledge base is converted to CNF once and one
+    solver is reused: each query is a solve under the assumption ¬query, so
+    clauses learned for one query speed up the next.
+    Engine "auto" picks "models" for small knowledge bases and "sat" otherwise.
+    Unless `simplified` is False, the knowledge base and every query are
+    simplified first; `sizes` records the knowledge base's size before and after.
+    """
+
+    def __init__(self, knowledge, engine="auto", simplified=True):
+        self.simplified = simplified
+        before = size(knowledge)
+        if simplified:
+            knowledge = simplify(knowledge)
+        self.sizes = (before, size(knowledge))
+        self.knowledge = knowledge
+        self.symbols = knowledge.symbols()
+        if engine == "auto":
+            engine = "models" if len(self.symbols) <= MODELS_LIMIT else "sat"
+        if engine not in ("models", "sat"):
+            raise ValueError(f"unknown engine {engine}")
+        self.engine = engine
+        self.queries = 0
+        if engine == "models":
+            self.program = compiled.Program([knowledge], self.symbols)
+            self.models = [] ## (chunk, bit vector of models of the knowledge base)
+            for chunk in range(self.program.chunks):
+                kb, = self.program.run(chunk)
+                if kb:
+                    self.models.append((chunk, kb))
+        else:
+            self.cnf = sat.CNF()
+            self.cnf.add(knowledge)
+            self.solver = sat.Solver(self.cnf)
+            self.added = len(self.cnf.clauses) ## clauses already given to the solver
+
+    def entails(self, query):
+        """Checks if the knowledge base entails query."""
+        return self.entails_all([query])[0]
+
+    def entails_all(self, queries):
+        """
+        Returns a list with, for each query, whether the knowledge base entails it.
+        """
+        queries = list(queries)
+        if self.simplified:
+            queries = [simplify(query) for query in queries]
+        self.queries += len(queries)
+        if self.engine == "sat":
+            return [self.sat_entails(query) for query in queries]
+        answers = [None] * len(queries)
+        batch = []
+        for n, query in enumerate(queries):
+            if query.symbols() <= self.symbols:
+                batch.append(n)
+            else:
+                ## the stored models do not assign the new symbols
+                answers[n] = compiled.model_check(self.knowledge, query)
+        if batch:
+            program = compiled.Program([queries[n] for n in batch], self.program.symbols)
+            entailed = [True] * len(batch)
+            for chunk, kb in self.models:
+                for k, q in enumerate(program.run(chunk)):
+                    if kb & ~q:
+                        entailed[k] = False
+                if not any(entailed):
+                    break
+            for n, value in zip(batch, entailed):
+                answers[n] = value
+        return answers
+
+    def report(self):
+        """
+        Returns a line describing how much simplification shrank the knowledge base.
+        """
+        before, after = self.sizes
+        return (f"knowledge base simplified from {before} to {after} nodes "
+                f"({100 * (before - after) / before:.0f}% smaller)")
+
+    def sat_entails(self, query):
+        lit = self.cnf.literal(query)
+        ## the new clauses only define Tseitin variables, so they can stay
+        self.solver.add_clauses(self.cnf.clauses[self.added:])
+        self.added = len(self.cnf.clauses)
+        return not self.solver.solve(assumptions=[-lit])
@@ -0,0 +1,215 @@
+"""
+Simplification of logic.py sentences before entailment checking.
+
+True is represented by the empty conjunction And() and False by the empty
+disjunction Or(), which evaluate to True and False in every model.
+"""
+
+from logic import *
+
+
+def is_true(sentence):
+    return isinstance(sentence, And) and not sentence.conjuncts
+
+
+def is_false(sentence):
+    return isinstance(sentence, Or) and not sentence.disjuncts
+
+
+def complementary(a, b):
+    """
+    Returns True if `a` is the negation of `b`.
+    """
+    return ((isinstance(a, Not) and a.operand == b)
+            or (isinstance(b, Not) and b.operand == a))
+
+
+def join(cls, args):
+    """
+    Returns the simplified And (cls=And) or Or (cls=Or) of `args`:
+    nested operators of the same kind are flattened, duplicates and neutral
+    constants are removed, and a complementary pair or an absorbing constant
+    collapses the whole operator to a constant.
+    """
+    neutral, absorbing = (is_true, is_false) if cls is And else (is_false, is_true)
+    flat = dict() ## keeps the first of equal operands, in order
+    stack = list(reversed(args))
+    while stack:
+        arg = stack.pop()
+        if isinstance(arg, cls) and not neutral(arg):
+            stack.extend(reversed(arg.conjuncts if cls is And else arg.disjuncts))
+        elif absorbing(arg):
+            return arg
+        elif not neutral(arg):
+            flat.setdefault(commutative_key(arg), arg)
+    flat = {arg: arg for arg in flat.values()}
+    for arg in flat:
+        if isinstance(arg, Not) and arg.operand in flat:
+            return Or() if cls is And else And()
+    ## literal operands fix their symbol inside the other operands:
+    ## true in a conjunction, false in a disjunction
+    model = dict()
+    for arg in flat:
+        literal = unit(arg)
+        if literal is not None:
+            model[literal[0]] = literal[1] if cls is And else not literal[1]
+    if model and len(model) < len(flat):
+        args = [arg for arg in flat if unit(arg) is not None]
+        changed = False
+        for arg in flat:
+            if unit(arg) is None:
+                new = substitute(arg, model)
+                changed = changed or new is not arg
+                args.append(new)
+        if changed:
+            return join(cls, args)
+    if len(flat) == 1:
+        return next(iter(flat))
+    return cls(*flat)
+
+
+def commutative_key(sentence):
+    """
+    Returns a key equal for sentences that differ only in the order of
+    And/Or operands at the top level.
+    """
+    if isinstance(sentence, (And, Or)):
+        return (type(sentence), frozenset(subsentences(sentence)))
+    return sentence
+
+
+def negate(sentence):
+    """
+    Returns the simplified negation of an already simplified sentence.
+    """
+    return normalize(sentence, positive=False)
+
+
+def biconditional(a, b):
+    """
+    Returns the simplified Biconditional of simplified sentences `a` and `b`.
+    """
+    if a == b:
+        return And()
+    if complementary(a, b):
+        return Or()
+    for x, y in ((a, b), (b, a)):
+        if is_true(x):
+            return y
+        if is_false(x):
+            return negate(y)
+    return Biconditional(a, b)
+
+
+def normalize(sentence, positive=True):
+    """
+    Returns a simplified sentence equivalent to `sentence` (or to its
+    negation if `positive` is False). Negations are pushed down to the
+    symbols, implications become disjunctions, And/Or are flattened and
+    deduplicated, literals are propagated into their siblings, and
+    tautologies and contradictions become constants.
+    """
+    done = dict() ## (id(node), polarity) -> simplified node
+    stack = [(sentence, positive, False)]
+    while stack:
+        node, positive, expanded = stack.pop()
+        key = (id(node), positive)
+        if key in done:
+            continue
+        if isinstance(node, Not):
+            children = [(node.operand, not positive)]
+        elif isinstance(node, (And, Or)):
+            children = [(child, positive) for child in subsentences(node)]
+        elif isinstance(node, Implication):
+            children = [(node.antecedent, not positive), (node.consequent, positive)]
+        elif isinstance(node, Biconditional):
+            children = [(node.left, True), (node.right, positive)]
+        else:
+            ## symbols, and sentence classes this module does not know
+            done[key] = node if positive else Not(node)
+            continue
+        if not expanded:
+            stack.append((node, positive, True))
+            stack.extend((child, polarity, False) for child, polarity in children)
+            continue
+        args = [done[(id(child), polarity)] for child, polarity in children]
+        if isinstance(node, Not):
+            result = args[0]
+        elif isinstance(node, Biconditional):
+            result = biconditional(*args)
+        elif isinstance(node, Or) or isinstance(node, Implication):
+            result = join(Or if positive else And, args)
+        else:
+            result = join(And if positive else Or, args)
+        done[key] = result
+    return done[(id(sentence), positive)]
+
+
+def substitute(sentence, model):
+    """
+    Returns `sentence` simplified with the symbols in `model` (a dict of
+    symbol name -> bool) replaced by constants.
+    """
+    done = dict()
+    stack = [(sentence, False)]
+    while stack:
+        node, expanded = stack.pop()
+        if id(node) in done:
+            continue
+        if node.symbol_set().isdisjoint(model):
+            ## nothing to substitute, keep the node itself
+            done[id(node)] = node
+            continue
+        if isinstance(node, Symbol):
+            if node.name in model:
+                done[id(node)] = And() if model[node.name] else Or()
+            else:
+                done[id(node)] = node
+            continue
+        children = subsentences(node)
+        if not expanded:
+            stack.append((node, True))
+            stack.extend((child, False) for child in children)
+            continue
+        args = [done[id(child)] for child in children]
+        if isinstance(node, Not):
+            done[id(node)] = negate(args[0])
+        elif isinstance(node, Biconditional):
+            done[id(node)] = biconditional(*args)
+        elif isinstance(node, Or):
+            done[id(node)] = join(Or, args)
+        else:
+            done[id(node)] = join(And, args)
+    return done[id(sentence)]
+
+
+def unit(sentence):
+    """
+    Returns (symbol name, value) if `sentence` is a literal, else None.
+    """
+    if isinstance(sentence, Symbol):
+        return sentence.name, True
+    if isinstance(sentence, Not) and isinstance(sentence.operand, Symbol):
+        return sentence.operand.name, False
+    return None
+
+
+def simplify(sentence):
+    """
+    Returns an interned sentence equivalent to `sentence` (see `normalize`).
+    """
+    return intern(normalize(sentence))
+
+
+def size(sentence):
+    """
+    Returns the number of nodes of `sentence` as a tree, which is how often
+    `evaluate` visits a node per model.
+    """
+    count = 0
+    stack = [sentence]
+    while stack:
+        node = stack.pop()
+        count += 1
+        stack.extend(subsentences(node))
+    return count
@@ -0,0 +1,65 @@
+"""
+Array-backed Minesweeper game for large boards.
+
+Mines are placed with a single draw of distinct cell indices, and the
+number of neighbouring mines of every cell is computed once by summing
+the eight shifted copies of the mine array. nearby_mines and is_mine are
+then plain array reads, so boards of a million cells are practical.
+"""
+
+import numpy as np
+
+from minesweeper import Minesweeper
+
+
+class ArrayMinesweeper(Minesweeper):
+    """
+    Minesweeper game with the same interface as Minesweeper, storing the
+    board and the neighbour counts as NumPy arrays.
+    """
+
+    def __init__(self, height=8, width=8, mines=8, seed=None):
+
+        # Set initial width, height, and number of mines
+        self.height = height
+        self.width = width
+
+        # Pick distinct cells for the mines in one draw
+        rng = np.random.default_rng(seed)
+        positions = rng.choice(height * width, size=mines, replace=False)
+        self.board = np.zeros((height, width), dtype=bool)
+        self.board.flat[positions] = True
+        self.mines = {divmod(p, width) for p in positions.tolist()}
+
+        # Number of mines around each cell, not counting the cell itself
+        self.counts = neighbor_counts(self.board)
+
+        # At first, player has found no mines
+        self.mines_found = set()
+
+    def is_mine(self, cell):
+        return bool(self.board[cell])
+
+    def nearby_mines(self, cell):
+        """
+        Returns the number of mines that are
+        within one row and column of a given cell,
+        not including the cell itself.
+        """
+        return int(self.counts[cell])
+
+
+def neighbor_counts(board):
+    """
+    Returns an array with, for each cell of the boolean array `board`, the
+    number of true cells among its (up to) eight neighbours.
+    """
+    height, width = board.shape
+    padded = np.zeros((height + 2, width + 2), dtype=np.uint8)
+    padded[1:-1, 1:-1] = board
+    counts = np.zeros((height, width), dtype=np.uint8)
+    for di in range(3):
+        for dj in range(3):
+            if di != 1 or dj != 1:
+                counts += padded[di:di + height, dj:dj + width]
+    return counts
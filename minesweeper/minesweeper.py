@@ -1,6 +1,8 @@
 import itertools
 import random
 
+from probability import ProbabilityEngine
+
 debugmode = False
 
 class Minesweeper():
@@ -84,6 +86,30 @@ class Minesweeper():
         """
         return self.mines_found == self.mines
 
+    def cascade(self, cell, revealed=()):
+        """
+        Reveals `cell` and, as long as a revealed cell has no neighbouring
+        mines, all of its neighbours, in one breadth-first pass. Cells in
+        `revealed` are not revealed again. Returns the list of (cell, count)
+        pairs revealed, starting with `cell`, which must not be a mine.
+        """
+        seen = {cell}
+        queue = [cell]
+        observations = []
+        for cell in queue:
+            count = self.nearby_mines(cell)
+            observations.append((cell, count))
+            if count:
+                continue
+            for i in range(cell[0] - 1, cell[0] + 2):
+                for j in range(cell[1] - 1, cell[1] + 2):
+                    if (0 <= i < self.height and 0 <= j < self.width
+                            and (i, j) not in seen
+                            and (i, j) not in revealed):
+                        seen.add((i, j))
+                        queue.append((i, j))
+        return observations
+
 
 class Sentence():
     """
@@ -96,6 +122,9 @@ class Sentence():
         self.cells = set(cells)
         self.count = count
 
+    def __len__(self):
+        return len(self.cells)
+
     def __eq__(self, other):
         return self.cells == other.cells and self.count == other.count
 
@@ -141,17 +170,250 @@ class Sentence():
             self.cells.remove(cell)
         return
 
+    def key(self):
+        """
+        Returns a hashable value that is equal for equal sentences.
+        """
+        return (frozenset(self.cells), self.count)
+
+    def issubset(self, other):
+        return self.cells.issubset(other.cells)
+
+    def difference(self, other):
+        """
+        Returns the sentence about the cells of self that are not in
+        other, assuming other's cells are a subset of self's.
+        """
+        return Sentence(self.cells.difference(other.cells),
+                        self.count - other.count)
+
+
+class BitSentence():
+    """
+    Sentence whose cells are the set bits of a Python int, cell (i, j)
+    being bit i * width + j. Subset tests, differences, equality and
+    hashing are a few integer operations instead of set operations on
+    tuples. The hash follows the cells and count, so a sentence must not
+    be marked while it is used as a set member or dict key.
+    """
+
+    def __init__(self, cells, count, width):
+        self.width = width
+        self.bits = 0
+        for i, j in cells:
+            self.bits |= 1 << (i * width + j)
+        self.count = count
+
+    @classmethod
+    def from_bits(cls, bits, count, width):
+        sentence = cls((), count, width)
+        sentence.bits = bits
+        return sentence
+
+    @property
+    def cells(self):
+        cells = set()
+        bits = self.bits
+        while bits:
+            low = bits & -bits
+            cells.add(divmod(low.bit_length() - 1, self.width))
+            bits ^= low
+        return cells
+
+    def __len__(self):
+        return self.bits.bit_count()
+
+    def __eq__(self, other):
+        return self.bits == other.bits and self.count == other.count
+
+    def __hash__(self):
+        return hash((self.bits, self.count))
+
+    def __str__(self):
+        return f"{self.cells} = {self.count}"
+
+    def bit(self, cell):
+        return 1 << (cell[0] * self.width + cell[1])
+
+    def known_mines(self):
+        """
+        Returns the set of all cells in self.cells known to be mines.
+        """
+        if self.bits and self.count == self.bits.bit_count():
+            return self.cells
+        return set()
+
+    def known_safes(self):
+        """
+        Returns the set of all cells in self.cells known to be safe.
+        """
+        if self.bits and self.count == 0:
+            return self.cells
+        return set()
+
+    def mark_mine(self, cell):
+        """
+        Updates internal knowledge representation given the fact that
+        a cell is known to be a mine.
+        """
+        bit = self.bit(cell)
+        if self.bits & bit:
+            self.bits ^= bit
+            self.count -= 1
+            if self.count < 0:
+                exit(f"incorrect count={self.count}, after mark {cell} as mine")
+
+    def mark_safe(self, cell):
+        """
+        Updates internal knowledge representation given the fact that
+        a cell is known to be safe.
+        """
+        self.bits &= ~self.bit(cell)
+
+    def key(self):
+        return (self.bits, self.count)
+
+    def issubset(self, other):
+        return self.bits & ~other.bits == 0
+
+    def difference(self, other):
+        """
+        Returns the sentence about the cells of self that are not in
+        other, assuming other's cells are a subset of self's.
+        """
+        return BitSentence.from_bits(self.bits & ~other.bits,
+                                     self.count - other.count, self.width)
+
+
+class KnowledgeBase():
+    """
+    Set of sentences indexed by cell, so marking a cell or looking for
+    subset sentences only touches the sentences that contain the cell.
+    Identical sentences are stored once. Sentences that changed and still
+    have to be checked for new inferences are kept in a worklist.
+
+    With a `limit`, compact drops the oldest sentences beyond that many.
+    Dropping a sentence loses what could be inferred from it, but never
+    leads to a wrong conclusion.
+    """
+
+    def __init__(self, limit=None):
+        self.sentences = dict() ## id -> sentence
+        self.ids = dict() ## sentence key -> id, to drop duplicates
+        self.index = dict() ## cell -> set of ids of sentences containing it
+        self.dirty = set() ## ids of sentences not yet checked for inferences
+        self.next_id = 0
+        self.limit = limit
+        self.peak = 0 ## most sentences held at once
+        self.evicted = 0 ## sentences dropped by compact
+
+    def __iter__(self):
+        return iter(self.sentences.values())
+
+    def __len__(self):
+        return len(self.sentences)
+
+    def add(self, sentence):
+        """
+        Adds `sentence` unless it is empty or already known, and queues
+        it for inference. Returns its id, or None if it was not added.
+        """
+        key = sentence.key()
+        if not len(sentence) or key in self.ids:
+            return None
+        sid = self.next_id
+        self.next_id += 1
+        self.sentences[sid] = sentence
+        self.ids[key] = sid
+        for cell in sentence.cells:
+            self.index.setdefault(cell, set()).add(sid)
+        self.dirty.add(sid)
+        self.peak = max(self.peak, len(self.sentences))
+        return sid
+
+    def remove(self, sid):
+        sentence = self.sentences.pop(sid)
+        del self.ids[sentence.key()]
+        self.unindex(sid, sentence.cells)
+        self.dirty.discard(sid)
+
+    def unindex(self, sid, cells):
+        for cell in cells:
+            ids = self.index[cell]
+            ids.discard(sid)
+            if not ids:
+                del self.index[cell]
+
+    def mark(self, cell, mine):
+        """
+        Removes `cell` from the sentences that contain it, counting it as
+        a mine if `mine` is true. Changed sentences are queued again.
+        """
+        for sid in self.index.pop(cell, ()):
+            sentence = self.sentences[sid]
+            del self.ids[sentence.key()]
+            if mine:
+                sentence.mark_mine(cell)
+            else:
+                sentence.mark_safe(cell)
+            key = sentence.key()
+            if not len(sentence) or key in self.ids:
+                ## emptied, or now the same as another sentence
+                del self.sentences[sid]
+                self.unindex(sid, sentence.cells)
+                self.dirty.discard(sid)
+                continue
+            self.ids[key] = sid
+            self.dirty.add(sid)
+
+    def compact(self):
+        """
+        Drops the oldest sentences beyond the limit. Must not be called
+        while infer is running. Returns the number of sentences dropped.
+        """
+        if self.limit is None or len(self.sentences) <= self.limit:
+            return 0
+        excess = len(self.sentences) - self.limit
+        ## ids grow with time, and dicts keep insertion order
+        for sid in list(self.sentences)[:excess]:
+            self.remove(sid)
+        self.evicted += excess
+        return excess
+
+    def related(self, sid):
+        """
+        Returns the ids of the other sentences sharing a cell with `sid`.
+        """
+        related = set()
+        for cell in self.sentences[sid].cells:
+            related.update(self.index[cell])
+        related.discard(sid)
+        return related
+
+
 class MinesweeperAI():
     """
     Minesweeper game player
     """
 
-    def __init__(self, height=8, width=8):
+    def __init__(self, height=8, width=8, bitsets=False, mines=None,
+                 max_sentences=None, rng=None):
 
         # Set initial height and width
         self.height = height
         self.width = width
 
+        # Source of random moves, the random module unless given
+        self.rng = rng or random
+
+        # Total number of mines on the board, if known; it lets
+        # make_random_move pick the cell least likely to be a mine
+        self.mine_count = mines
+        self.probabilities = ProbabilityEngine(self.rng)
+
+        # Store the cells of sentences as bits of an int (BitSentence)
+        self.bitsets = bitsets
+
         # Keep track of which cells have been clicked on
         self.moves_made = set()
 
@@ -159,8 +421,21 @@ class MinesweeperAI():
         self.mines = set()
         self.safes = set()
 
-        # List of sentences about the game known to be true
-        self.knowledge = []
+        # Cells neither clicked on nor known to be mines, also kept in a
+        # list with each cell's position, to draw one in constant time
+        self.unknown_cells = list(
+            itertools.product(range(height), range(width)))
+        self.unknown = set(self.unknown_cells)
+        self.unknown_index = {cell: i for i, cell in enumerate(self.unknown_cells)}
+
+        # Unknown cells known to be safe
+        self.unknown_safes = set()
+
+        # Sentences about the game known to be true, at most max_sentences
+        self.knowledge = KnowledgeBase(max_sentences)
+
+        # Number of sentences after each add_knowledge
+        self.knowledge_sizes = []
 
     def mark_mine(self, cell):
         """
@@ -168,8 +443,23 @@ class MinesweeperAI():
         to mark that cell as a mine as well.
         """
         self.mines.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_mine(cell)
+        self.remove_unknown(cell)
+        self.knowledge.mark(cell, True)
+
+    def remove_unknown(self, cell):
+        """
+        Removes `cell` from the unknown cells, moving the last cell of the
+        list into its place.
+        """
+        if cell not in self.unknown:
+            return
+        self.unknown.remove(cell)
+        self.unknown_safes.discard(cell)
+        i = self.unknown_index.pop(cell)
+        last = self.unknown_cells.pop()
+        if last != cell:
+            self.unknown_cells[i] = last
+            self.unknown_index[last] = i
 
     def mark_safe(self, cell):
         """
@@ -177,8 +467,9 @@ class MinesweeperAI():
         to mark that cell as safe as well.
         """
         self.safes.add(cell)
-        for sentence in self.knowledge:
-            sentence.mark_safe(cell)
+        if cell in self.unknown:
+            self.unknown_safes.add(cell)
+        self.knowledge.mark(cell, False)
 
     def add_knowledge(self, cell, count):
         """
@@ -207,7 +498,45 @@ class MinesweeperAI():
             for x in self.knowledge:
                 print(f'{x}\n')
         self.moves_made.add(cell)
+        self.remove_unknown(cell)
         self.mark_safe(cell)
+        self.add_sentence(cell, count)
+        self.infer()
+        self.compact()
+        if debugmode:
+            print('Current knowledge are\n')
+            for x in self.knowledge:
+                print(f'{x}\n')
+            print('\n\n\n\n')
+
+    def add_knowledge_batch(self, observations):
+        """
+        Adds the knowledge of several revealed cells at once, given as
+        (cell, count) pairs, as add_knowledge does for each of them, but
+        draws the conclusions only once, after all the sentences are added.
+        """
+        observations = list(observations)
+        for cell, _ in observations:
+            self.moves_made.add(cell)
+            self.remove_unknown(cell)
+            self.mark_safe(cell)
+        for cell, count in observations:
+            self.add_sentence(cell, count)
+        self.infer()
+        self.compact()
+
+    def compact(self):
+        """
+        Bounds the knowledge base after inference and records its size.
+        """
+        self.knowledge.compact()
+        self.knowledge_sizes.append(len(self.knowledge))
+
+    def add_sentence(self, cell, count):
+        """
+        Adds the sentence that the neighbours of `cell` not known to be
+        safe or mines hold `count` mines, less the known mines among them.
+        """
         nearby_potential_mines = set()
         for i in range(cell[0] - 1, cell[0] + 2):
             for j in range(cell[1] - 1, cell[1] + 2):
@@ -228,70 +557,53 @@ class MinesweeperAI():
         # important: for cases when count=0 or count=len(nearby_potential_mines),
         # we must add as a new sentence, instead of directly mark as safe or mark as mines
         # because the new sentence may be combined with other knowledge to infer more new sentences 
-        self.knowledge.append(Sentence(nearby_potential_mines, count))
+        if self.bitsets:
+            sentence = BitSentence(nearby_potential_mines, count, self.width)
+        else:
+            sentence = Sentence(nearby_potential_mines, count)
+        self.knowledge.add(sentence)
         if debugmode:
-            print(f'add knowledge:{self.knowledge[-1]}\n')
-
-        update = True
-        while update:
-            update = False
-            # three types of knowledge will be checked:
-            # 1. Whether known_mines can be inferred
-            # 2. Whether known_safes can be inferred
-            # 3. Whether new knowledge can be inferred using subset method:
-            # ie: if set1=count1, set2=count2, where set1 is a subset of set2
-            # when set2-set1= count2-count1
-            removelist = set()
-            for si in range(len(self.knowledge)):
-                ms = self.knowledge[si].known_mines()
-                if len(ms):
-                    update = True
-                    if debugmode:
-                        print(f'knowledge is:{self.knowledge[si]}, mark new mines:{ms}\n')
-                    for m in ms.copy():
-                        self.mark_mine(m)
-                ss = self.knowledge[si].known_safes()
-                if len(ss):
-                    update = True
-                    if debugmode:
-                        print(f'knowledge is {self.knowledge[si]}, mark new safes: {ss}\n')
-                    for s in ss.copy():
-                        self.mark_safe(s)
-                if self.knowledge[si].count==0 and len(self.knowledge[si].cells)==0:
-                    removelist.add(si)
-
-            knowlen = len(self.knowledge)
-            for si in range(knowlen):
-                for sj in range(knowlen):
-                    if si!=sj and self.knowledge[si].count>0 and \
-                        self.knowledge[si].count<=self.knowledge[sj].count and \
-                        self.knowledge[si].cells.issubset(self.knowledge[sj].cells) and \
-                        not self.knowledge[sj].cells.issubset(self.knowledge[si].cells):
-                        update = True
-                        removelist.add(sj)
-                        newcells = self.knowledge[sj].cells.difference(self.knowledge[si].cells)
-                        self.knowledge.append(Sentence(newcells, self.knowledge[sj].count-self.knowledge[si].count))
-                        if debugmode:
-                            print(f'Found knowledge {self.knowledge[si]} is subset of {self.knowledge[sj]}.')
-                            print(f'Add new knowledge {self.knowledge[-1]}\n')
-            # remove empty sentence or redundant sentence due to subset inference method
-            for si in reversed(range(len(self.knowledge))):
-                if si in removelist:
-                    del self.knowledge[si]             
-            if debugmode:
-                print(f'update is {update}\n')
-                print(f'Mark cell {cell} as safe, and it has {count} mines nearby\n')
-                print('Current mines are:\n')
-                print(','.join(['('+str(x[0])+','+str(x[1])+')' for x in self.mines]))
-                print('\n')
-                print('Current safes are\n')
-                print(','.join(['('+str(x[0])+','+str(x[1])+')' for x in self.safes]))
-                print('\n')
-                print('Current knowledge are\n')
-                for x in self.knowledge:
-                    print(f'{x}\n')
-                print('\n\n\n\n')
+            print(f'add knowledge:{sentence}\n')
 
+    def infer(self):
+        """
+        Draws every conclusion from the sentences in the worklist:
+        marks the cells of sentences that are all mines or all safe, and
+        adds the difference of each sentence and every other sentence that
+        is a strict subset of it. The superset is kept, so it can still be
+        combined with its other subsets. Only sentences sharing a cell with
+        a changed sentence are examined.
+        """
+        knowledge = self.knowledge
+        while knowledge.dirty:
+            sid = knowledge.dirty.pop()
+            sentence = knowledge.sentences[sid]
+            ms = sentence.known_mines()
+            ss = sentence.known_safes()
+            if len(ms) or len(ss):
+                if debugmode:
+                    print(f'knowledge is:{sentence}, mark new mines:{ms}, '
+                          f'mark new safes:{ss}\n')
+                for m in list(ms):
+                    self.mark_mine(m)
+                for s in list(ss):
+                    self.mark_safe(s)
+                continue
+            for other_id in knowledge.related(sid):
+                other = knowledge.sentences[other_id]
+                if len(other) < len(sentence):
+                    subset, superset = other, sentence
+                elif len(other) > len(sentence):
+                    subset, superset = sentence, other
+                else:
+                    continue
+                if (0 < subset.count <= superset.count
+                        and subset.issubset(superset)):
+                    derived = superset.difference(subset)
+                    if debugmode:
+                        print(f'Found knowledge {subset} is subset of {superset}.')
+                        print(f'Add new knowledge {derived}\n')
+                    knowledge.add(derived)
 
     def make_safe_move(self):
         """
@@ -314,16 +626,67 @@ class MinesweeperAI():
         Should choose randomly among cells that:
             1) have not already been chosen, and
             2) are not known to be mines
+        If the number of mines is known, only the cells with the lowest
+        probability of being a mine are chosen from.
         """
-        if len(self.mines)+len(self.moves_made) == self.height*self.width:
+        if not self.unknown:
             return None
-        candidates = set()
-        for i in range(self.height):
-            for j in range(self.width):
-                if (i,j) not in self.mines and (i,j) not in self.moves_made:
-                    candidates.add((i,j))
-        if len(candidates):
-            return random.sample(list(candidates), 1)[0]
-        else:
+        if self.mine_count is not None:
+            move = self.least_likely_mine()
+            if move is not None:
+                return move
+        return self.random_unknown()
+
+    def random_unknown(self, *excluded):
+        """
+        Returns a random unknown cell that is in none of the sets
+        `excluded`, or None. Draws from the list of unknown cells, and only
+        scans it after many draws hit excluded cells.
+        """
+        cells = self.unknown_cells
+        for _ in range(32):
+            cell = cells[self.rng.randrange(len(cells))]
+            if not any(cell in group for group in excluded):
+                return cell
+        candidates = [cell for cell in cells
+                      if not any(cell in group for group in excluded)]
+        if not candidates:
             return None
+        return self.rng.choice(candidates)
 
+    def least_likely_mine(self):
+        """
+        Returns a random cell among the unknown cells, not known to be
+        safe, with the lowest probability of being a mine, or None.
+        """
+        result = self.probabilities.solve(
+            self.knowledge, len(self.unknown) - len(self.unknown_safes),
+            self.mine_count - len(self.mines))
+        if result is None:
+            return None
+        frontier, interior = result
+        values = list(frontier.values())
+        if interior is not None:
+            values.append(interior)
+        if not values:
+            return None
+        lowest = min(values) + 1e-12
+        candidates = [cell for cell, p in frontier.items() if p <= lowest]
+        interior_count = 0
+        if interior is not None and interior <= lowest:
+            interior_count = (len(self.unknown) - len(self.unknown_safes)
+                              - len(frontier))
+        choice = self.rng.randrange(len(candidates) + interior_count)
+        if choice < len(candidates):
+            return candidates[choice]
+        return self.random_unknown(frontier, self.unknown_safes)
+
+    def mine_probabilities(self):
+        """
+        Returns a dict from each unknown cell to its probability of being a
+        mine, given the knowledge and the number of mines, or None if they
+        are inconsistent.
+        """
+        return self.probabilities.probabilities(
+            self.knowledge, self.unknown - self.unknown_safes,
+            self.mine_count - len(self.mines))
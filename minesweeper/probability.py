@@ -0,0 +1,283 @@
+"""
+Mine probabilities for the unknown cells of a Minesweeper game.
+
+The sentences of the knowledge base are split into independent components
+(sentences sharing no cell). For each component the consistent mine
+configurations are counted by backtracking, by number of mines, together
+with how often each cell is a mine. The components are then combined with
+the cells no sentence mentions, weighting every total number of frontier
+mines by the ways to place the remaining mines among those other cells.
+
+Components with too many configurations to enumerate are estimated from
+random consistent configurations instead.
+"""
+
+import math
+import random
+
+NODE_LIMIT = 100000 ## backtracking steps before a component is sampled
+SAMPLES = 2000 ## configurations drawn for a sampled component
+SAMPLE_NODE_LIMIT = 10000 ## backtracking steps allowed for one sample
+CACHE_SIZE = 4096 ## components remembered between calls
+
+
+def comb(n, k):
+    if k < 0 or k > n:
+        return 0
+    return math.comb(n, k)
+
+
+def convolve(a, b):
+    """
+    Returns the distribution of the sum of two numbers of mines, given
+    as dicts from number of mines to number of configurations.
+    """
+    c = dict()
+    for i, x in a.items():
+        for j, y in b.items():
+            c[i + j] = c.get(i + j, 0) + x * y
+    return c
+
+
+def components(sentences):
+    """
+    Splits `sentences` into lists of sentences that share cells.
+    """
+    parent = dict()
+
+    def find(cell):
+        while parent[cell] != cell:
+            parent[cell] = parent[parent[cell]]
+            cell = parent[cell]
+        return cell
+
+    for sentence in sentences:
+        cells = list(sentence.cells)
+        for cell in cells:
+            parent.setdefault(cell, cell)
+        root = find(cells[0])
+        for cell in cells[1:]:
+            parent[find(cell)] = root
+    groups = dict()
+    for sentence in sentences:
+        groups.setdefault(find(next(iter(sentence.cells))), []).append(sentence)
+    return list(groups.values())
+
+
+class Component():
+    """
+    A set of sentences sharing cells, and the cells they mention, in an
+    order where neighbouring cells come close to each other so that
+    sentences are decided early during backtracking.
+    """
+
+    def __init__(self, sentences):
+        self.constraints = [(list(s.cells), s.count) for s in sentences]
+        by_cell = dict()
+        for c, (cells, _) in enumerate(self.constraints):
+            for cell in cells:
+                by_cell.setdefault(cell, []).append(c)
+        ## breadth first order over the sentences
+        self.cells = []
+        seen = set()
+        queue = [min(by_cell)]
+        seen.add(queue[0])
+        for cell in queue:
+            self.cells.append(cell)
+            for c in by_cell[cell]:
+                for other in sorted(self.constraints[c][0]):
+                    if other not in seen:
+                        seen.add(other)
+                        queue.append(other)
+        self.touches = [by_cell[cell] for cell in self.cells]
+
+    def key(self):
+        return frozenset((frozenset(cells), count)
+                         for cells, count in self.constraints)
+
+    def search(self, max_mines, node_limit, rng=None):
+        """
+        Backtracks over the mine configurations of the component with at
+        most `max_mines` mines. Without `rng`, every configuration is
+        visited and (counts, cell_counts) is returned: counts[k] is the
+        number of configurations with k mines, and cell_counts[k][i] how
+        many of those have a mine in self.cells[i]. With `rng`, values are
+        tried in random order and the first configuration found is
+        returned as a list of 0/1. Returns None if more than `node_limit`
+        steps are needed.
+        """
+        n = len(self.cells)
+        need = [count for _, count in self.constraints]
+        free = [len(cells) for cells, _ in self.constraints]
+        counts = dict()
+        cell_counts = dict()
+        tried = [0] * n ## values tried at each position, 0 to 2
+        order = [(0, 1)] * n
+        value = [None] * n ## value applied at each position
+        mines = 0
+        nodes = 0
+        pos = 0
+        if rng is not None:
+            order = [(0, 1) if rng.random() < 0.5 else (1, 0) for _ in range(n)]
+        while pos >= 0:
+            if pos == n:
+                if rng is not None:
+                    return list(value)
+                counts[mines] = counts.get(mines, 0) + 1
+                row = cell_counts.setdefault(mines, [0] * n)
+                for i in range(n):
+                    row[i] += value[i]
+                pos -= 1
+                continue
+            if value[pos] is not None:
+                ## undo the value applied at this position
+                v = value[pos]
+                for c in self.touches[pos]:
+                    need[c] += v
+                    free[c] += 1
+                mines -= v
+                value[pos] = None
+            if tried[pos] == 2:
+                tried[pos] = 0
+                pos -= 1
+                continue
+            v = order[pos][tried[pos]]
+            tried[pos] += 1
+            nodes += 1
+            if nodes > node_limit:
+                return None
+            value[pos] = v
+            mines += v
+            ok = mines <= max_mines
+            for c in self.touches[pos]:
+                need[c] -= v
+                free[c] -= 1
+                if need[c] < 0 or need[c] > free[c]:
+                    ok = False
+            if ok:
+                pos += 1
+        if rng is not None:
+            return None
+        return counts, cell_counts
+
+    def sample(self, max_mines, rng):
+        """
+        Estimates (counts, cell_counts) as search does, from random
+        consistent configurations.
+        """
+        n = len(self.cells)
+        counts = dict()
+        cell_counts = dict()
+        for _ in range(SAMPLES):
+            values = self.search(max_mines, SAMPLE_NODE_LIMIT, rng)
+            if values is None:
+                continue
+            k = sum(values)
+            counts[k] = counts.get(k, 0) + 1
+            row = cell_counts.setdefault(k, [0] * n)
+            for i in range(n):
+                row[i] += values[i]
+        return counts, cell_counts
+
+
+class ProbabilityEngine():
+    """
+    Computes mine probabilities, remembering the configuration counts of
+    components between calls: most components do not change from one move
+    to the next.
+    """
+
+    def __init__(self, rng=None):
+        self.rng = rng or random.Random()
+        self.cache = dict() ## component key -> exact counts, cell counts
+        self.sampled = 0 ## components estimated by sampling in the last call
+
+    def count(self, component, max_mines):
+        """
+        Returns (counts, cell_counts) for `component`, with cell_counts[k]
+        a dict from cell to count. Exact counts cover any number of mines
+        so they can be reused after mines are found; sampled ones have at
+        most `max_mines` mines.
+        """
+        key = component.key()
+        if key in self.cache:
+            return self.cache[key]
+        result = component.search(len(component.cells), NODE_LIMIT)
+        exact = result is not None
+        if not exact:
+            self.sampled += 1
+            result = component.sample(max_mines, self.rng)
+        counts, cell_counts = result
+        result = counts, {k: dict(zip(component.cells, row))
+                          for k, row in cell_counts.items()}
+        if exact:
+            if len(self.cache) >= CACHE_SIZE:
+                self.cache.clear()
+            self.cache[key] = result
+        return result
+
+    def probabilities(self, sentences, unknown, mines_left):
+        """
+        Returns a dict from each cell of `unknown` (the cells neither
+        revealed nor known to be mines or safe) to its probability of being
+        a mine, given `sentences` and the number of mines not yet found.
+        Returns None if the sentences have no consistent configuration.
+        """
+        result = self.solve(sentences, len(unknown), mines_left)
+        if result is None:
+            return None
+        probabilities, interior = result
+        for cell in unknown:
+            if cell not in probabilities:
+                probabilities[cell] = interior
+        return probabilities
+
+    def solve(self, sentences, unknown, mines_left):
+        """
+        Returns (frontier, interior) given `sentences`, the number of
+        unknown cells and the number of mines not yet found. frontier maps
+        each cell of the sentences to its probability of being a mine, and
+        interior is the probability of each of the other unknown cells, or
+        None if there are none. Returns None if the sentences have no
+        consistent configuration.
+        """
+        self.sampled = 0
+        sentences = [s for s in sentences if len(s)]
+        parts = [Component(group) for group in components(sentences)]
+        n = unknown - sum(len(part.cells) for part in parts)
+
+        results = [self.count(part, mines_left) for part in parts]
+        ## prefix[i] is the distribution of mines in components before i
+        prefix = [{0: 1}]
+        for counts, _ in results:
+            prefix.append(convolve(prefix[-1], counts))
+        suffix = {0: 1}
+        total = 0
+        probabilities = dict()
+        for i in range(len(parts) - 1, -1, -1):
+            counts, cell_counts = results[i]
+            others = convolve(prefix[i], suffix)
+            ## weight of the configurations of part i with k mines
+            weight = {k: sum(ways * comb(n, mines_left - k - f)
+                             for f, ways in others.items())
+                      for k in counts}
+            total = sum(counts[k] * weight[k] for k in counts)
+            if total == 0:
+                return None
+            for cell in parts[i].cells:
+                mine = sum(cell_counts[k][cell] * weight[k] for k in counts)
+                probabilities[cell] = mine / total
+            suffix = convolve(suffix, counts)
+        interior = None
+        if n:
+            ## expected number of mines among the interior cells, per cell
+            frontier_mines = prefix[-1]
+            if not parts:
+                total = sum(ways * comb(n, mines_left - f)
+                            for f, ways in frontier_mines.items())
+                if total == 0:
+                    return None
+            mine = sum(ways * comb(n - 1, mines_left - f - 1)
+                       for f, ways in frontier_mines.items())
+            interior = mine / total
+        return probabilities, interior
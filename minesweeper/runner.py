@@ -1,12 +1,29 @@
-import pygame
+import os
 import sys
 import time
 
+# Usage: python runner.py [HxW:M] [--headless [frames]]
+# --headless plays AI moves on a dummy video driver and reports frame times
+HEADLESS = "--headless" in sys.argv
+if HEADLESS:
+    os.environ["SDL_VIDEODRIVER"] = "dummy"
+
+import pygame
+
 from minesweeper import Minesweeper, MinesweeperAI
+from simulate import parse_config
 
 HEIGHT = 8
 WIDTH = 8
 MINES = 8
+FPS = 30 ## frame cap of the interactive loop
+FRAMES = 1000 ## frames played in headless mode
+
+args = [arg for arg in sys.argv[1:] if arg != "--headless"]
+if args and ":" in args[0]:
+    HEIGHT, WIDTH, MINES = parse_config(args.pop(0))
+if HEADLESS and args:
+    FRAMES = int(args[0])
 
 # Colors
 BLACK = (0, 0, 0)
@@ -17,6 +34,7 @@ WHITE = (255, 255, 255)
 pygame.init()
 size = width, height = 600, 400
 screen = pygame.display.set_mode(size)
+clock = pygame.time.Clock()
 
 # Fonts
 OPEN_SANS = "assets/fonts/OpenSans-Regular.ttf"
@@ -28,7 +46,7 @@ largeFont = pygame.font.Font(OPEN_SANS, 40)
 BOARD_PADDING = 20
 board_width = ((2 / 3) * width) - (BOARD_PADDING * 2)
 board_height = height - (BOARD_PADDING * 2)
-cell_size = int(min(board_width / WIDTH, board_height / HEIGHT))
+cell_size = max(1, int(min(board_width / WIDTH, board_height / HEIGHT)))
 board_origin = (BOARD_PADDING, BOARD_PADDING)
 
 # Add images
@@ -37,17 +55,94 @@ flag = pygame.transform.scale(flag, (cell_size, cell_size))
 mine = pygame.image.load("assets/images/mine.png")
 mine = pygame.transform.scale(mine, (cell_size, cell_size))
 
-# Create game and AI agent
-game = Minesweeper(height=HEIGHT, width=WIDTH, mines=MINES)
-ai = MinesweeperAI(height=HEIGHT, width=WIDTH)
-
-# Keep track of revealed cells, flagged cells, and if a mine was hit
-revealed = set()
-flags = set()
-lost = False
+# Render digits and labels once
+digits = [smallFont.render(str(n), True, BLACK) for n in range(9)]
+texts = dict()
+
+
+def render(text, font, color):
+    if (text, font, color) not in texts:
+        texts[(text, font, color)] = font.render(text, True, color)
+    return texts[(text, font, color)]
+
+
+# The board is drawn on its own surface, where only changed cells are redrawn
+board = pygame.Surface((WIDTH * cell_size, HEIGHT * cell_size))
+all_cells = [(i, j) for i in range(HEIGHT) for j in range(WIDTH)]
+
+
+def draw_cell(cell):
+    """
+    Draws `cell` on the board surface as it should look now.
+    """
+    i, j = cell
+    rect = pygame.Rect(j * cell_size, i * cell_size, cell_size, cell_size)
+    pygame.draw.rect(board, GRAY, rect)
+    pygame.draw.rect(board, WHITE, rect, 3)
+
+    # Add a mine, flag, or number if needed
+    if lost and game.is_mine(cell):
+        board.blit(mine, rect)
+    elif cell in flags:
+        board.blit(flag, rect)
+    elif cell in revealed:
+        neighbors = digits[game.nearby_mines(cell)]
+        neighborsTextRect = neighbors.get_rect()
+        neighborsTextRect.center = rect.center
+        board.blit(neighbors, neighborsTextRect)
+
+
+def cell_at(mouse):
+    """
+    Returns the board cell under `mouse`, or None.
+    """
+    i = (mouse[1] - board_origin[1]) // cell_size
+    j = (mouse[0] - board_origin[0]) // cell_size
+    if 0 <= i < HEIGHT and 0 <= j < WIDTH:
+        return (i, j)
+    return None
+
+
+def new_game():
+    global game, ai, revealed, flags, lost, dirty
+    game = Minesweeper(height=HEIGHT, width=WIDTH, mines=MINES)
+    ai = MinesweeperAI(height=HEIGHT, width=WIDTH, mines=MINES)
+
+    # Keep track of revealed cells, flagged cells, and if a mine was hit
+    revealed = set()
+    flags = set()
+    lost = False
+
+    # Cells to redraw on the next frame
+    dirty = set(all_cells)
+
+
+def ai_move():
+    """
+    Returns the AI's next move, or None, flagging its mines if it has no
+    moves left.
+    """
+    global flags
+    move = ai.make_safe_move()
+    if move is None:
+        move = ai.make_random_move()
+        if move is None:
+            dirty.update(flags, ai.mines)
+            flags = ai.mines.copy()
+            if not HEADLESS:
+                print("No moves left to make.")
+        elif not HEADLESS:
+            print("No known safe moves, AI making random move.")
+    elif not HEADLESS:
+        print("AI making safe move.")
+    return move
+
+
+new_game()
 
 # Show instructions initially
-instructions = True
+instructions = not HEADLESS
+frame_times = []
 
 while True:
 
@@ -56,13 +151,14 @@ while True:
         if event.type == pygame.QUIT:
             sys.exit()
 
+    frame_start = time.perf_counter()
     screen.fill(BLACK)
 
     # Show game instructions
     if instructions:
 
         # Title
-        title = largeFont.render("Play Minesweeper", True, WHITE)
+        title = render("Play Minesweeper", largeFont, WHITE)
         titleRect = title.get_rect()
         titleRect.center = ((width / 2), 50)
         screen.blit(title, titleRect)
@@ -74,14 +170,14 @@ while True:
             "Mark all mines successfully to win!"
         ]
         for i, rule in enumerate(rules):
-            line = smallFont.render(rule, True, WHITE)
+            line = render(rule, smallFont, WHITE)
             lineRect = line.get_rect()
             lineRect.center = ((width / 2), 150 + 30 * i)
             screen.blit(line, lineRect)
 
         # Play game button
         buttonRect = pygame.Rect((width / 4), (3 / 4) * height, width / 2, 50)
-        buttonText = mediumFont.render("Play Game", True, BLACK)
+        buttonText = render("Play Game", mediumFont, BLACK)
         buttonTextRect = buttonText.get_rect()
         buttonTextRect.center = buttonRect.center
         pygame.draw.rect(screen, WHITE, buttonRect)
@@ -96,46 +192,21 @@ while True:
                 time.sleep(0.3)
 
         pygame.display.flip()
+        clock.tick(FPS)
         continue
 
-    # Draw board
-    cells = []
-    for i in range(HEIGHT):
-        row = []
-        for j in range(WIDTH):
-
-            # Draw rectangle for cell
-            rect = pygame.Rect(
-                board_origin[0] + j * cell_size,
-                board_origin[1] + i * cell_size,
-                cell_size, cell_size
-            )
-            pygame.draw.rect(screen, GRAY, rect)
-            pygame.draw.rect(screen, WHITE, rect, 3)
-
-            # Add a mine, flag, or number if needed
-            if game.is_mine((i, j)) and lost:
-                screen.blit(mine, rect)
-            elif (i, j) in flags:
-                screen.blit(flag, rect)
-            elif (i, j) in revealed:
-                neighbors = smallFont.render(
-                    str(game.nearby_mines((i, j))),
-                    True, BLACK
-                )
-                neighborsTextRect = neighbors.get_rect()
-                neighborsTextRect.center = rect.center
-                screen.blit(neighbors, neighborsTextRect)
-
-            row.append(rect)
-        cells.append(row)
+    # Draw board, redrawing only the cells that changed
+    for cell in dirty:
+        draw_cell(cell)
+    dirty.clear()
+    screen.blit(board, board_origin)
 
     # AI Move button
     aiButton = pygame.Rect(
         (2 / 3) * width + BOARD_PADDING, (1 / 3) * height - 50,
         (width / 3) - BOARD_PADDING * 2, 50
     )
-    buttonText = mediumFont.render("AI Move", True, BLACK)
+    buttonText = render("AI Move", mediumFont, BLACK)
     buttonRect = buttonText.get_rect()
     buttonRect.center = aiButton.center
     pygame.draw.rect(screen, WHITE, aiButton)
@@ -146,7 +217,7 @@ while True:
         (2 / 3) * width + BOARD_PADDING, (1 / 3) * height + 20,
         (width / 3) - BOARD_PADDING * 2, 50
     )
-    buttonText = mediumFont.render("Reset", True, BLACK)
+    buttonText = render("Reset", mediumFont, BLACK)
     buttonRect = buttonText.get_rect()
     buttonRect.center = resetButton.center
     pygame.draw.rect(screen, WHITE, resetButton)
@@ -154,69 +225,79 @@ while True:
 
     # Display text
     text = "Lost" if lost else "Won" if game.mines == flags else ""
-    text = mediumFont.render(text, True, WHITE)
+    text = render(text, mediumFont, WHITE)
     textRect = text.get_rect()
     textRect.center = ((5 / 6) * width, (2 / 3) * height)
     screen.blit(text, textRect)
 
     move = None
 
-    left, _, right = pygame.mouse.get_pressed()
+    if HEADLESS:
+
+        # Play an AI move every frame, and a new game once one is over
+        if lost or game.mines == flags:
+            new_game()
+        else:
+            move = ai_move()
+        left = right = 0
+    else:
+        left, _, right = pygame.mouse.get_pressed()
 
     # Check for a right-click to toggle flagging
     if right == 1 and not lost:
-        mouse = pygame.mouse.get_pos()
-        for i in range(HEIGHT):
-            for j in range(WIDTH):
-                if cells[i][j].collidepoint(mouse) and (i, j) not in revealed:
-                    if (i, j) in flags:
-                        flags.remove((i, j))
-                    else:
-                        flags.add((i, j))
-                    time.sleep(0.2)
+        cell = cell_at(pygame.mouse.get_pos())
+        if cell is not None and cell not in revealed:
+            if cell in flags:
+                flags.remove(cell)
+            else:
+                flags.add(cell)
+            dirty.add(cell)
+            time.sleep(0.2)
 
     elif left == 1:
         mouse = pygame.mouse.get_pos()
 
         # If AI button clicked, make an AI move
         if aiButton.collidepoint(mouse) and not lost:
-            move = ai.make_safe_move()
-            if move is None:
-                move = ai.make_random_move()
-                if move is None:
-                    flags = ai.mines.copy()
-                    print("No moves left to make.")
-                else:
-                    print("No known safe moves, AI making random move.")
-            else:
-                print("AI making safe move.")
+            move = ai_move()
             time.sleep(0.2)
 
         # Reset game state
         elif resetButton.collidepoint(mouse):
-            game = Minesweeper(height=HEIGHT, width=WIDTH, mines=MINES)
-            ai = MinesweeperAI(height=HEIGHT, width=WIDTH)
-            revealed = set()
-            flags = set()
-            lost = False
+            new_game()
             continue
 
         # User-made move
         elif not lost:
-            for i in range(HEIGHT):
-                for j in range(WIDTH):
-                    if (cells[i][j].collidepoint(mouse)
-                            and (i, j) not in flags
-                            and (i, j) not in revealed):
-                        move = (i, j)
+            cell = cell_at(mouse)
+            if (cell is not None
+                    and cell not in flags
+                    and cell not in revealed):
+                move = cell
 
     # Make move and update AI knowledge
     if move:
         if game.is_mine(move):
             lost = True
+            dirty.update(game.mines)
         else:
-            nearby = game.nearby_mines(move)
-            revealed.add(move)
-            ai.add_knowledge(move, nearby)
+            observations = game.cascade(move, revealed | flags)
+            cells = [cell for cell, _ in observations]
+            revealed.update(cells)
+            dirty.update(cells)
+            ai.add_knowledge_batch(observations)
 
     pygame.display.flip()
+
+    if HEADLESS:
+        frame_times.append(time.perf_counter() - frame_start)
+        if len(frame_times) == FRAMES:
+            frame_times.sort()
+            print(f"{HEIGHT}x{WIDTH}, {MINES} mines: {FRAMES} frames, "
+                  f"mean {1000 * sum(frame_times) / FRAMES:.3f} ms, "
+                  f"median {1000 * frame_times[FRAMES // 2]:.3f} ms, "
+                  f"95th percentile "
+                  f"{1000 * frame_times[int(0.95 * FRAMES)]:.3f} ms")
+            sys.exit()
+    else:
+        clock.tick(FPS)
@@ -0,0 +1,149 @@
+"""
+Headless Minesweeper simulation: MinesweeperAI plays seeded games across a
+process pool, and the win rate, moves per game, inference time per move and
+throughput are reported for every board configuration.
+"""
+
+import multiprocessing
+import random
+import sys
+import time
+
+from minesweeper import Minesweeper, MinesweeperAI
+
+CONFIGS = "8x8:8,16x16:40,16x30:99"
+CHUNK = 64 ## games sent to a worker at a time
+
+
+def parse_config(text):
+    """
+    Parses "HxW:M" into (height, width, mines). M is a number of mines, or
+    a density if it contains a decimal point.
+    """
+    size, mines = text.split(":")
+    height, width = (int(x) for x in size.split("x"))
+    if "." in mines:
+        mines = round(float(mines) * height * width)
+    return height, width, int(mines)
+
+
+def play_game(height, width, mines, seed, informed=True, array=False,
+              cascade=False, max_sentences=None):
+    """
+    Plays one game seeded with `seed`. The AI is told the number of mines
+    if `informed`. The game is an ArrayMinesweeper, which needs NumPy, if
+    `array`. If `cascade`, each move reveals the cells Minesweeper.cascade
+    reveals and the AI is told about them as one batch. The AI keeps at
+    most `max_sentences` sentences.
+
+    Returns a dict of the game's stats: wins (1 or 0), moves, guesses
+    (random moves), thinking (seconds spent in add_knowledge and picking
+    moves), sentences (sum of the knowledge size after each move) and
+    peak (largest knowledge size).
+    """
+    random.seed(seed)
+    if array:
+        from board import ArrayMinesweeper
+        game = ArrayMinesweeper(height=height, width=width, mines=mines,
+                                seed=seed)
+    else:
+        game = Minesweeper(height=height, width=width, mines=mines)
+    ai = MinesweeperAI(height=height, width=width,
+                       mines=mines if informed else None,
+                       max_sentences=max_sentences)
+    moves = 0
+    guesses = 0
+    thinking = 0.0
+
+    def stats(won):
+        return {"wins": int(won), "moves": moves, "guesses": guesses,
+                "thinking": thinking, "sentences": sum(ai.knowledge_sizes),
+                "peak": ai.knowledge.peak}
+
+    while True:
+        start = time.perf_counter()
+        move = ai.make_safe_move()
+        if move is None:
+            move = ai.make_random_move()
+            guesses += 1
+        thinking += time.perf_counter() - start
+        if move is None:
+            guesses -= 1
+            return stats(True)
+        moves += 1
+        if game.is_mine(move):
+            return stats(False)
+        start = time.perf_counter()
+        if cascade:
+            ai.add_knowledge_batch(game.cascade(move, ai.moves_made))
+        else:
+            ai.add_knowledge(move, game.nearby_mines(move))
+        thinking += time.perf_counter() - start
+
+
+def play_star(args):
+    return play_game(*args)
+
+
+def simulate(height, width, mines, games, seed=0, informed=True,
+             processes=None, array=False, cascade=False, max_sentences=None):
+    """
+    Plays `games` games with seeds seed, seed + 1, ... across a process
+    pool. Returns a dict with the number of games, the totals of the
+    stats returned by play_game (the largest value for peak), and elapsed
+    (wall-clock seconds).
+    """
+    totals = {"games": 0, "wins": 0, "moves": 0, "guesses": 0,
+              "thinking": 0.0, "sentences": 0, "peak": 0}
+    jobs = ((height, width, mines, s, informed, array, cascade, max_sentences)
+            for s in range(seed, seed + games))
+    start = time.perf_counter()
+    with multiprocessing.Pool(processes) as pool:
+        for stats in pool.imap_unordered(play_star, jobs, chunksize=CHUNK):
+            totals["games"] += 1
+            for key, value in stats.items():
+                if key == "peak":
+                    totals[key] = max(totals[key], value)
+                else:
+                    totals[key] += value
+    totals["elapsed"] = time.perf_counter() - start
+    return totals
+
+
+def report(config, totals):
+    games = totals["games"]
+    moves = max(totals["moves"], 1)
+    print(f"{config}: {games} games, "
+          f"win rate {100 * totals['wins'] / games:.1f}%, "
+          f"{totals['moves'] / games:.1f} moves/game, "
+          f"{totals['guesses'] / games:.2f} guesses/game, "
+          f"{1e6 * totals['thinking'] / moves:.1f} us/move, "
+          f"{totals['sentences'] / moves:.1f} sentences/move "
+          f"(peak {totals['peak']}), "
+          f"{games / totals['elapsed']:.1f} games/s")
+
+
+def main():
+    flags = {"--uniform", "--array", "--cascade"}
+    args = [arg for arg in sys.argv[1:] if arg not in flags]
+    if len(args) > 5:
+        sys.exit("Usage: python simulate.py [games] [HxW:M,...] [seed] "
+                 "[processes] [max sentences] [--uniform] [--array] "
+                 "[--cascade]")
+    games = int(args[0]) if len(args) > 0 else 1000
+    configs = (args[1] if len(args) > 1 else CONFIGS).split(",")
+    seed = int(args[2]) if len(args) > 2 else 0
+    processes = int(args[3]) if len(args) > 3 else None
+    max_sentences = int(args[4]) if len(args) > 4 else None
+    informed = "--uniform" not in sys.argv
+    array = "--array" in sys.argv
+    cascade = "--cascade" in sys.argv
+    for config in configs:
+        height, width, mines = parse_config(config)
+        totals = simulate(height, width, mines, games, seed, informed,
+                          processes, array, cascade, max_sentences)
+        report(f"{height}x{width}, {mines} mines", totals)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,213 @@
+"""
+Q-learning for Nim with a dense NumPy Q-table.
+
+A Nim state is a number in a mixed-radix system whose digits are the pile
+sizes, so every state reachable from the initial piles has a rank in
+range(prod(pile + 1)). Every action (i, j) has an index too, and the
+Q-table is a states x actions array. Actions not available in a state
+hold -inf, so the best action of a state is one vectorized argmax over
+its row. Training plays games directly on state ranks, on a copy of the
+table in Python lists along with the best value and action of every
+state, so a move costs a few list operations instead of NumPy calls on
+a 16-element row.
+"""
+
+import contextlib
+import io
+import random
+import sys
+import time
+
+import numpy as np
+
+import nim
+from nim import NimAI
+
+
+class DenseNimAI(NimAI):
+
+    def __init__(self, initial=[1, 3, 5, 7], alpha=0.5, epsilon=0.1,
+                 rng=None):
+        """
+        Initialize AI with a Q-table of zeros over all states reachable
+        from piles `initial`, an alpha (learning) rate, and an epsilon rate.
+
+        `self.q[rank, index]` is the Q-value of taking the action
+        `self.actions[index]` in the state of rank `rank`, and -inf if
+        that action is not available in that state.
+        """
+        self.alpha = alpha
+        self.epsilon = epsilon
+        self.rng = rng or random.Random()
+        self.initial = list(initial)
+
+        # Rank of piles p is the sum of p[i] * strides[i]
+        self.strides = []
+        stride = 1
+        for pile in reversed(self.initial):
+            self.strides.append(stride)
+            stride *= pile + 1
+        self.strides.reverse()
+        states = stride
+
+        self.actions = [(i, j) for i, pile in enumerate(self.initial)
+                        for j in range(1, pile + 1)]
+        self.index = {action: a for a, action in enumerate(self.actions)}
+
+        # Change of rank made by each action
+        self.delta = [j * self.strides[i] for i, j in self.actions]
+
+        # piles[rank, i] is the size of pile i in the state of rank `rank`
+        ranks = np.arange(states)
+        piles = np.stack([ranks // s % (p + 1)
+                          for s, p in zip(self.strides, self.initial)], axis=1)
+        action_pile = np.array([i for i, _ in self.actions])
+        action_count = np.array([j for _, j in self.actions])
+        legal = piles[:, action_pile] >= action_count
+        self.legal_actions = [np.flatnonzero(row).tolist() for row in legal]
+
+        self.q = np.where(legal, 0.0, -np.inf)
+
+    def rank(self, state):
+        return sum(p * s for p, s in zip(state, self.strides))
+
+    def get_q_value(self, state, action):
+        """
+        Return the Q-value for the state `state` and the action `action`.
+        """
+        return self.q.item(self.rank(state), self.index[action])
+
+    def update_q_value(self, state, action, old_q, reward, future_rewards):
+        """
+        Update the Q-value for the state `state` and the action `action`,
+        as NimAI.update_q_value does.
+        """
+        new_q = old_q + self.alpha * (reward + future_rewards - old_q)
+        self.q[self.rank(state), self.index[action]] = new_q
+
+    def best_future_reward(self, state):
+        """
+        Return the maximum Q-value of the actions available in `state`,
+        or 0 if there are none.
+        """
+        return self.best_value(self.rank(state))
+
+    def choose_action(self, state, epsilon=True):
+        """
+        Given a state `state`, return an action `(i, j)` to take: a random
+        available action with probability `self.epsilon` if `epsilon` is
+        `True`, otherwise the available action with the highest Q-value.
+        """
+        rank = self.rank(state)
+        if rank == 0:
+            raise Exception("Game already ended")
+        return self.actions[self.choose(rank, epsilon)]
+
+    def best_value(self, rank):
+        if rank == 0:
+            return 0
+        return self.q[rank].max().item()
+
+    def choose(self, rank, epsilon=True):
+        """
+        Returns the index of the action to take in the state of rank `rank`.
+        """
+        if epsilon and self.epsilon > self.rng.random():
+            actions = self.legal_actions[rank]
+            return actions[self.rng.randrange(len(actions))]
+        return self.q[rank].argmax().item()
+
+    def learn(self, rank, action, new_rank, reward):
+        old_q = self.q.item(rank, action)
+        future = self.best_value(new_rank)
+        self.q[rank, action] = old_q + self.alpha * (reward + future - old_q)
+
+    def train(self, n):
+        """
+        Trains the AI by playing `n` games against itself, with the same
+        updates as nim.train, on state ranks instead of pile lists.
+        Gives the same table as calling choose and learn for every move.
+        """
+        q = self.q.tolist()
+        best = [max(row) for row in q] ## best Q-value of each state
+        best_action = [row.index(m) for row, m in zip(q, best)]
+        best[0] = 0 ## the final state has no actions
+        legal_actions = self.legal_actions
+        delta = self.delta
+        alpha = self.alpha
+        epsilon = self.epsilon
+        rng = self.rng
+
+        def learn(rank, action, new_rank, reward):
+            row = q[rank]
+            old_q = row[action]
+            new_q = old_q + alpha * (reward + best[new_rank] - old_q)
+            row[action] = new_q
+            if new_q > best[rank]:
+                best[rank] = new_q
+                best_action[rank] = action
+            elif action == best_action[rank] or new_q == best[rank]:
+                ## the best action may have changed, as argmax would see it
+                best[rank] = max(row)
+                best_action[rank] = row.index(best[rank])
+
+        start = self.rank(self.initial)
+        for _ in range(n):
+            rank = start
+            player = 0
+
+            # Keep track of last (rank, action) made by either player
+            last = [None, None]
+            while True:
+                if epsilon > rng.random():
+                    actions = legal_actions[rank]
+                    action = actions[rng.randrange(len(actions))]
+                else:
+                    action = best_action[rank]
+                last[player] = (rank, action)
+                new_rank = rank - delta[action]
+                player = 1 - player
+
+                # When game is over, update Q values with rewards
+                if new_rank == 0:
+                    learn(rank, action, new_rank, -1)
+                    if last[player] is not None:
+                        learn(*last[player], new_rank, 1)
+                    break
+
+                # If game is continuing, no rewards yet
+                elif last[player] is not None:
+                    learn(*last[player], new_rank, 0)
+                rank = new_rank
+        self.q[:] = q
+        return self
+
+def train(n, initial=[1, 3, 5, 7]):
+    """
+    Train a DenseNimAI by playing `n` games against itself.
+    """
+    return DenseNimAI(initial).train(n)
+
+
+def main():
+    if len(sys.argv) > 2:
+        sys.exit("Usage: python dense.py [games]")
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else 10000
+
+    # nim.train prints every move; time it without the output
+    begin = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        nim.train(games)
+    sparse = time.perf_counter() - begin
+
+    begin = time.perf_counter()
+    train(games)
+    dense = time.perf_counter() - begin
+
+    print(f"NimAI: {games / sparse:.0f} games/s")
+    print(f"DenseNimAI: {games / dense:.0f} games/s, "
+          f"{sparse / dense:.1f} times faster")
+
+
+if __name__ == "__main__":
+    main()
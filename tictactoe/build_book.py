@@ -0,0 +1,3 @@
+from tictactoe import build_book, BOOK_FILE
+
+print(f"Wrote {build_book(BOOK_FILE)} positions to {BOOK_FILE}")
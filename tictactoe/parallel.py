@@ -0,0 +1,142 @@
+"""
+Parallel root-split alpha-beta search for Tic Tac Toe
+"""
+
+import multiprocessing
+import os
+import sys
+import time
+
+import tictactoe as ttt
+
+## per-process state of a worker, set by init_worker
+engine = None
+
+
+def init_worker(shared_alpha, n, k):
+    """
+    Sets up a worker process: the board constants of the parent and one
+    Search whose killer and history tables are reused across root moves.
+    """
+    global engine
+    ttt.N, ttt.K = n, k
+    engine = ttt.Search(time_limit=None)
+    engine.win = ttt.win_score(n)
+    engine.shared_alpha = shared_alpha
+
+
+def search_move(board, move, depth):
+    """
+    Searches root move `move` to `depth` plies and returns
+    (move, value, nodes, raised), where value is for the player making the
+    move. The search window starts at the best root value found so far by
+    any process, and narrows while the search runs, so a value at or below
+    that best value may only be an upper bound. `raised` tells whether the
+    value raised the shared best value, in which case it is exact.
+    """
+    mark = ttt.player(board)
+    other = ttt.O if mark == ttt.X else ttt.X
+    board = [list(row) for row in board]
+    board[move[0]][move[1]] = mark
+    start = engine.nodes
+    if ttt.wins_at(board, move):
+        value = engine.win - 1
+    else:
+        alpha = engine.shared_alpha.value
+        value = -engine.alphabeta(board, other, depth-1, -engine.win, -alpha, 1)
+    with engine.shared_alpha.get_lock():
+        raised = value > engine.shared_alpha.value
+        if raised:
+            engine.shared_alpha.value = value
+    return move, value, engine.nodes - start, raised
+
+
+def root_moves(board):
+    """
+    Returns the root moves ordered by the static value after making them,
+    best first, so the eldest brother is most likely the best move.
+    """
+    mark = ttt.player(board)
+    scored = []
+    for move in ttt.candidates(board):
+        child = ttt.result(board, move)
+        value = ttt.evaluate(child) if mark == ttt.X else -ttt.evaluate(child)
+        if ttt.wins_at(child, move):
+            value = float('inf')
+        scored.append((value, move))
+    scored.sort(key=lambda x: x[0], reverse=True)
+    return [move for _, move in scored]
+
+
+def parallel_search(board, depth, processes=None):
+    """
+    Returns (action, value, nodes) for the current player, searching every
+    root move to `depth` plies. The first (eldest) move is searched alone to
+    establish a bound, then the remaining moves are split across a pool of
+    `processes` workers (Young Brothers Wait at the root). Workers share the
+    best root value so far, which narrows the window of searches still running.
+    With processes=1 the same search runs serially in this process.
+    """
+    if ttt.terminal(board):
+        return None, ttt.utility(board), 0
+    n = len(board)
+    moves = root_moves(board)
+    shared_alpha = multiprocessing.Value('q', -ttt.win_score(n))
+    processes = processes or os.cpu_count()
+    results = []
+    if processes == 1:
+        init_worker(shared_alpha, n, ttt.K)
+        for move in moves:
+            results.append(search_move(board, move, depth))
+    else:
+        ## search the eldest brother first, in this process
+        init_worker(shared_alpha, n, ttt.K)
+        results.append(search_move(board, moves[0], depth))
+        with multiprocessing.Pool(processes, initializer=init_worker,
+                                  initargs=(shared_alpha, n, ttt.K)) as pool:
+            results.extend(pool.starmap(
+                search_move, [(board, move, depth) for move in moves[1:]],
+                chunksize=1))
+    nodes = sum(r[2] for r in results)
+    ## the best value is exact only for the move that raised the shared
+    ## value to it; other moves with that value may have been cut off.
+    ## If no move raised it, every move loses, and the earliest is taken.
+    best = max(results, key=lambda r: (r[1], r[3], -moves.index(r[0])))
+    return best[0], best[1], nodes
+
+
+def benchmark(board, depth, cores=None):
+    """
+    Prints time, nodes and speedup of parallel_search against the serial
+    search for each number of processes in `cores`.
+    """
+    if cores is None:
+        cores = [1]
+        while cores[-1] * 2 <= os.cpu_count():
+            cores.append(cores[-1] * 2)
+    serial = None
+    for processes in cores:
+        start = time.perf_counter()
+        move, value, nodes = parallel_search(board, depth, processes)
+        elapsed = time.perf_counter() - start
+        if serial is None:
+            serial = elapsed
+        print(f"processes={processes}: move={move}, value={value}, "
+              f"nodes={nodes}, time={elapsed:.3f}s, speedup={serial / elapsed:.2f}x")
+
+
+def main():
+    if len(sys.argv) not in [1, 4]:
+        sys.exit("Usage: python parallel.py [N K depth]")
+    n, k, depth = (7, 5, 4) if len(sys.argv) == 1 else map(int, sys.argv[1:])
+    ttt.N, ttt.K = n, k
+    board = ttt.initial_state()
+    ## start from a few moves in so that the root has many candidates
+    for move in [(n//2, n//2), (n//2, n//2 + 1), (n//2 + 1, n//2)]:
+        board = ttt.result(board, move)
+    print(f"{n}x{n} board, {k} in a row, depth {depth}")
+    benchmark(board, depth)
+
+
+if __name__ == "__main__":
+    main()
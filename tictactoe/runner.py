@@ -15,7 +15,10 @@ screen = pygame.display.set_mode(size)
 
 mediumFont = pygame.font.Font("OpenSans-Regular.ttf", 28)
 largeFont = pygame.font.Font("OpenSans-Regular.ttf", 40)
-moveFont = pygame.font.Font("OpenSans-Regular.ttf", 60)
+
+# Shrink tiles so that larger boards still fit on the screen
+tile_size = min(80, int((height - 100) / ttt.N))
+moveFont = pygame.font.Font("OpenSans-Regular.ttf", int(0.75 * tile_size))
 
 user = None
 board = ttt.initial_state()
@@ -67,13 +70,12 @@ while True:
     else:
 
         # Draw game board
-        tile_size = 80
-        tile_origin = (width / 2 - (1.5 * tile_size),
-                       height / 2 - (1.5 * tile_size))
+        tile_origin = (width / 2 - (ttt.N / 2 * tile_size),
+                       height / 2 - (ttt.N / 2 * tile_size))
         tiles = []
-        for i in range(3):
+        for i in range(ttt.N):
             row = []
-            for j in range(3):
+            for j in range(ttt.N):
                 rect = pygame.Rect(
                     tile_origin[0] + j * tile_size,
                     tile_origin[1] + i * tile_size,
@@ -122,8 +124,8 @@ while True:
         click, _, _ = pygame.mouse.get_pressed()
         if click == 1 and user == player and not game_over:
             mouse = pygame.mouse.get_pos()
-            for i in range(3):
-                for j in range(3):
+            for i in range(ttt.N):
+                for j in range(ttt.N):
                     if (board[i][j] == ttt.EMPTY and tiles[i][j].collidepoint(mouse)):
                         board = ttt.result(board, (i, j))
 
@@ -3,13 +3,26 @@ Tic Tac Toe Player
 """
 
 import math
+import collections
 import copy
+import functools
+import json
+import os
+import struct
+import threading
+import time
 
 X = "X"
 O = "O"
 EMPTY = None
-N = 3
-debugmode = False
+N = 3 ## board size, the board is N by N
+K = 3 ## number of marks in a row needed to win, capped at the board size
+EXACT_SIZE = 3 ## boards up to this size are solved exactly, larger ones by Search
+TIME_LIMIT = 0.1 ## seconds per move for the iterative deepening search
+BOOK_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "book.bin")
+book = None ## solved 3x3 table, loaded from BOOK_FILE on first use
+book_lock = threading.Lock()
+tracer = None ## set to a Tracer to record the searches made by minimax
 minsteps = 0
 maxsteps = 0
 
@@ -18,9 +31,7 @@ def initial_state():
     """
     Returns starting state of the board.
     """
-    return [[EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY],
-            [EMPTY, EMPTY, EMPTY]]
+    return [[EMPTY] * N for _ in range(N)]
 
 def player(board):
     """
@@ -40,9 +51,10 @@ def actions(board):
     """
     Returns set of all possible actions (i, j) available on the board.
     """
+    n = len(board)
     acts = set()
-    for i in range(N):
-        for j in range(N):
+    for i in range(n):
+        for j in range(n):
             if board[i][j] == EMPTY:
                 acts.add((i,j))
     return acts
@@ -53,52 +65,96 @@ def result(board, action):
     Returns the board that results from making move (i, j) on the board.
     """
     i,j = action
-    if i<0 or j<0 or i>=N or j>=N:
+    if i<0 or j<0 or i>=len(board) or j>=len(board):
         raise Exception("Out of boundary move")
     if board[i][j] != EMPTY:
         raise Exception("Cannot make move")
-    # bcopy = copy.deepcopy(board)
-    # bcopy[i][j] = player(board)
-    # return bcopy
-    board[i][j] = player(board)
-    return board
+    bcopy = [list(row) for row in board]
+    bcopy[i][j] = player(board)
+    return bcopy
     
 
 def winner(board):
     """
     Returns the winner of the game, if there is one.
     """
-    #transposeboard = list(zip(*board))
-    for i in range(N):
-        ##check by row
-        if sum([1 if x=="X" else 0 for x in board[i]]) == N:
-            return X 
-        if sum([1 if x=="O" else 0 for x in board[i]]) == N:
-            return O
-        ##check by column
-        if sum([1 if row[i]=="X" else 0 for row in board]) == N:
-            return X
-        if sum([1 if row[i]=="O" else 0 for row in board]) == N:
-            return O
-    ##check by diagonal
-    if sum([1 if board[i][i]=="X" else 0 for i in range(N)]) == N:
-        return X
-    if sum([1 if board[i][i]=="O" else 0 for i in range(N)]) == N:
-        return O
-    if sum([1 if board[i][N-1-i]=="X" else 0 for i in range(N)]) == N:
-        return X
-    if sum([1 if board[i][N-1-i]=="O" else 0 for i in range(N)]) == N:
-        return O
+    n = len(board)
+    for line in lines(n, min(K, n)):
+        first = board[line[0][0]][line[0][1]]
+        if first is not EMPTY and all(board[i][j] == first for (i,j) in line):
+            return first
     return None
 
 
+@functools.lru_cache(maxsize=None)
+def lines(n, k):
+    """
+    Returns all windows of k cells in a row, column or diagonal
+    of an n by n board, each window as a tuple of (i, j) cells.
+    """
+    windows = []
+    for i in range(n):
+        for j in range(n):
+            for (di, dj) in ((0, 1), (1, 0), (1, 1), (1, -1)):
+                ei, ej = i + (k-1)*di, j + (k-1)*dj
+                if 0 <= ei < n and 0 <= ej < n:
+                    windows.append(tuple((i + s*di, j + s*dj) for s in range(k)))
+    return tuple(windows)
+
+
+def wins_at(board, action):
+    """
+    Returns True if the mark at cell `action` completes k=min(K, n) in a row.
+    Only the lines through `action` are checked, so this is much cheaper
+    than `winner` right after a move.
+    """
+    n = len(board)
+    k = min(K, n)
+    i, j = action
+    mark = board[i][j]
+    if mark is EMPTY:
+        return False
+    for (di, dj) in ((0, 1), (1, 0), (1, 1), (1, -1)):
+        count = 1
+        for sign in (1, -1):
+            r, c = i + sign*di, j + sign*dj
+            while 0 <= r < n and 0 <= c < n and board[r][c] == mark:
+                count += 1
+                r, c = r + sign*di, c + sign*dj
+        if count >= k:
+            return True
+    return False
+
+
+def evaluate(board):
+    """
+    Returns a heuristic value of a non-terminal board from X's point of view.
+    Every window that is still open for only one player scores 10**marks for
+    that player, so longer unblocked runs dominate shorter ones.
+    """
+    n = len(board)
+    score = 0
+    for line in lines(n, min(K, n)):
+        xs = os = 0
+        for (i,j) in line:
+            if board[i][j] == X:
+                xs += 1
+            elif board[i][j] == O:
+                os += 1
+        if xs and not os:
+            score += 10 ** xs
+        elif os and not xs:
+            score -= 10 ** os
+    return score
+
+
 def terminal(board):
     """
     Returns True if game is over, False otherwise.
     """
     if winner(board) is not None:
         return True
-    if sum([sum([1 if x == EMPTY else 0 for x in row]) for row in board]) == 0:
+    if not any(x == EMPTY for row in board for x in row):
         return True
     return False
 
@@ -124,24 +180,7 @@ def minmaxvalue(board, alpha, beta, Xisplaying):
     """
     global minsteps, maxsteps
     if terminal(board):
-        if debugmode:
-            print('current board is\n')
-            for i in range(N):
-                print('|'.join([x or '' for x in board[i]]))
-                print('\n')
-            print(f'terminal node, value={utility(board)}, alpha={alpha}, beta={beta}\n')
-            print(f'maxsteps={maxsteps}, minsteps={minsteps}\n')
-            input('press return to continue')
         return utility(board)
-    if debugmode:
-        print(f'alpha={alpha},beta={beta}, {X if Xisplaying else O} is playing\n')
-        print('current board is\n')
-        for i in range(N):
-            print('|'.join([x or '' for x in board[i]]))
-            print('\n')
-        print(f'Possible actions for {X if Xisplaying else O} are {actions(board)}\n')
-        print(f'maxsteps={maxsteps}, minsteps={minsteps}\n')
-        input('press return to continue')
     bestmove = None
     if Xisplaying:
         maxsteps += 1
@@ -151,9 +190,6 @@ def minmaxvalue(board, alpha, beta, Xisplaying):
             vnew = minmaxvalue(board, alpha, beta, False)
             board[i][j] = EMPTY
             alpha = max(alpha, vnew)
-            if debugmode:
-                print(f'candidate position for X={(i,j)}, vnew={vnew}, v={v}, alpha={alpha}, beta={beta}\n')
-                input('press return to continue')
             if vnew > v:
                 v = vnew
                 bestmove = (i,j)
@@ -169,9 +205,6 @@ def minmaxvalue(board, alpha, beta, Xisplaying):
             vnew = minmaxvalue(board, alpha, beta, True)
             board[i][j] = EMPTY
             beta = min(beta, vnew)
-            if debugmode:
-                print(f'candidate position for O={(i,j)}, vnew={vnew}, v={v}, alpha={alpha}, beta={beta}\n')
-                input('press return to continue')
             if vnew < v:
                 v = vnew
                 bestmove = (i,j)
@@ -222,56 +255,105 @@ def minimax(board):
     Returns the optimal action for the current player on the board.
     """
     global minsteps,maxsteps
-    minsteps, maxsteps = 0,0 ## count how many times minmaxvalue function is called
-    if terminal(board):
-        return None
-    p = player(board)
+    bestmove, stats = search(board, tracer=tracer)
+    minsteps, maxsteps = stats.min_nodes, stats.max_nodes
+    if stats.method == "exact":
+        print(f'minmaxvalue is called {minsteps} and {maxsteps} times\n')
+    elif stats.method == "iterative":
+        print(f'searched {stats.nodes} nodes to depth {stats.depth}\n')
+    return bestmove
+
+
+class SearchStats():
+    """
+    Statistics of a single call to `search`.
+    """
+
+    def __init__(self):
+        self.method = None ## "book", "exact" or "iterative"
+        self.value = None ## value of the board for X: utility, or heuristic for "iterative"
+        self.max_nodes = 0 ## non-terminal nodes expanded with X to move
+        self.min_nodes = 0 ## non-terminal nodes expanded with O to move
+        self.depth = 0 ## plies searched, for "iterative"
+        self.elapsed = 0.0 ## seconds
+
+    @property
+    def nodes(self):
+        return self.max_nodes + self.min_nodes
+
+    def __repr__(self):
+        return (f"SearchStats(method={self.method}, value={self.value}, "
+                f"nodes={self.nodes}, depth={self.depth}, elapsed={self.elapsed:.6f})")
+
+
+def search(board, time_limit=TIME_LIMIT, tracer=None):
+    """
+    Returns (action, stats): the optimal action for the current player on the
+    board, or None if the game is over, together with a SearchStats.
+    The board is never modified and no global state is written, so
+    any number of searches can run at the same time from different threads.
+    If a Tracer is given, every node of the search is recorded in it.
+    """
+    stats = SearchStats()
+    start = time.perf_counter()
     bestmove = None
-    if p == X: ## X wants to maximize
-        v, bestmove = max_value(board, float('-inf'), float('inf'))
+    entry = None
+    if len(board) == 3 and min(K, 3) == 3 and not terminal(board):
+        entry = book_lookup(board)
+    if terminal(board):
+        stats.value = utility(board)
+    elif entry is not None:
+        stats.method = "book"
+        bestmove, stats.value = entry
+    elif len(board) > EXACT_SIZE:
+        ## the exact search has no time budget and no move ordering, so only
+        ## small boards are solved with it; Search still searches to the end
+        ## once its depth reaches the number of empty cells
+        stats.method = "iterative"
+        if tracer is None:
+            engine = Search(time_limit=time_limit)
+        else:
+            engine = TracedSearch(tracer, time_limit=time_limit)
+        bestmove = engine.run(board)
+        stats.depth = engine.depth
+        stats.value = engine.value if player(board) == X else -engine.value
+        if player(board) == X:
+            stats.max_nodes = engine.nodes
+        else:
+            stats.min_nodes = engine.nodes
     else:
-        v, bestmove = min_value(board, float('-inf'), float('inf'))
-    
-    print(f'minmaxvalue is called {minsteps} and {maxsteps} times\n')
-    return bestmove
+        stats.method = "exact"
+        board = [list(row) for row in board]
+        if tracer is not None:
+            stats.value, bestmove = traced_value(
+                board, float('-inf'), float('inf'), player(board) == X, stats, tracer)
+        elif player(board) == X: ## X wants to maximize
+            stats.value, bestmove = max_value(board, float('-inf'), float('inf'), stats)
+        else:
+            stats.value, bestmove = min_value(board, float('-inf'), float('inf'), stats)
+    stats.elapsed = time.perf_counter() - start
+    return bestmove, stats
 
 
-def max_value(board, alpha, beta):
+def max_value(board, alpha, beta, stats=None):
     """
     Returns the min/max value of the new states from all possible actions
     When using alpha beta pruning, alpha and beta are up to date the optimal value for the max and min player
     alpha is updated to the maximize, beta is updated to minimize
     alpha, beta are initially set to be -Inf, +Inf
+    Expanded nodes are counted in `stats` if one is given
     """
-    global maxsteps
     if terminal(board):
-        if debugmode:
-            print('current board is\n')
-            for i in range(N):
-                print('|'.join([x or '' for x in board[i]]))
-                print('\n')
-            print(f'terminal node, value={utility(board)}, alpha={alpha}, beta={beta}\n')
-            input('press return to continue')
         return utility(board), None
-    maxsteps += 1
-    if debugmode:
-        print(f'alpha={alpha},beta={beta}, X is playing\n')
-        print('current board is\n')
-        for i in range(N):
-            print('|'.join([x or '' for x in board[i]]))
-            print('\n')
-        print(f'Possible actions for X are {actions(board)}\n')
-        input('press return to continue')
+    if stats is not None:
+        stats.max_nodes += 1
     bestmove = None
     v = float('-inf')
     for (i,j) in actions(board):
         board[i][j] = X
-        vnew, move = min_value(board, alpha, beta)
+        vnew, move = min_value(board, alpha, beta, stats)
         board[i][j] = EMPTY
         alpha = max(alpha, vnew)
-        if debugmode:
-            print(f'candidate position for X={(i,j)}, vnew={vnew}, v={v}, alpha={alpha}, beta={beta}\n')
-            input('press return to continue')
         if vnew > v:
             v = vnew
             bestmove = (i,j)
@@ -282,42 +364,25 @@ def max_value(board, alpha, beta):
     return v, bestmove
 
 
-def min_value(board, alpha, beta):
+def min_value(board, alpha, beta, stats=None):
     """
     Returns the min/max value of the new states from all possible actions
     When using alpha beta pruning, alpha and beta are up to date the optimal value for the max and min player
     alpha is updated to the maximize, beta is updated to minimize
     alpha, beta are initially set to be -Inf, +Inf
+    Expanded nodes are counted in `stats` if one is given
     """
-    global minsteps
     if terminal(board):
-        if debugmode:
-            print('current board is\n')
-            for i in range(N):
-                print('|'.join([x or '' for x in board[i]]))
-                print('\n')
-            print(f'terminal node, value={utility(board)}, alpha={alpha}, beta={beta}\n')
-            input('press return to continue')
         return utility(board), None
-    minsteps += 1
-    if debugmode:
-        print(f'alpha={alpha},beta={beta}, O is playing\n')
-        print('current board is\n')
-        for i in range(N):
-            print('|'.join([x or '' for x in board[i]]))
-            print('\n')
-        print(f'Possible actions for O are {actions(board)}\n')
-        input('press return to continue')
+    if stats is not None:
+        stats.min_nodes += 1
     bestmove = None
     v = float('inf')
     for (i,j) in actions(board):
         board[i][j] = O
-        vnew, move = max_value(board, alpha, beta)
+        vnew, move = max_value(board, alpha, beta, stats)
         board[i][j] = EMPTY
         beta = min(beta, vnew)
-        if debugmode:
-            print(f'candidate position for O={(i,j)}, vnew={vnew}, v={v}, alpha={alpha}, beta={beta}\n')
-            input('press return to continue')
         if vnew < v:
             v = vnew
             bestmove = (i,j)
@@ -326,3 +391,414 @@ def min_value(board, alpha, beta):
         if beta <= alpha:
             break
     return v, bestmove
+
+
+## One record per searched node:
+## kind is "terminal" (game over), "leaf" (depth cutoff of Search),
+## "cutoff" (not all children searched) or "node" (all children searched);
+## searched/available count the children, None when unknown.
+TraceEvent = collections.namedtuple(
+    "TraceEvent",
+    ["kind", "depth", "player", "alpha", "beta", "value", "searched", "available"])
+
+
+class Tracer():
+    """
+    Records search events in a ring buffer holding the last `capacity` events,
+    and passes each event to `callback` if one is given.
+    Searches run without a Tracer do no tracing work at all: tracing uses the
+    separate traced_value and TracedSearch code paths.
+    """
+
+    def __init__(self, capacity=100000, callback=None):
+        self.events = collections.deque(maxlen=capacity)
+        self.callback = callback
+        self.total = 0 ## events recorded, including those dropped from the buffer
+
+    def record(self, event):
+        self.total += 1
+        self.events.append(event)
+        if self.callback is not None:
+            self.callback(event)
+
+    def export(self, path):
+        """
+        Writes the buffered events to `path` as JSON lines.
+        """
+        with open(path, "w") as f:
+            for event in self.events:
+                f.write(json.dumps(event._asdict()) + "\n")
+
+    def summary(self):
+        return trace_summary(self.events)
+
+
+def load_trace(path):
+    """
+    Returns the list of TraceEvents in a file written by Tracer.export.
+    """
+    with open(path) as f:
+        return [TraceEvent(**json.loads(line)) for line in f if line.strip()]
+
+
+def trace_summary(events):
+    """
+    Returns a dict describing pruning efficiency of the traced events:
+    node counts by kind and by depth, the fraction of interior nodes that were
+    cut off, and the fraction of available children actually searched.
+    """
+    kinds = collections.Counter(event.kind for event in events)
+    depths = collections.Counter(event.depth for event in events)
+    interior = kinds["node"] + kinds["cutoff"]
+    searched = sum(event.searched or 0 for event in events)
+    available = sum(event.available or 0 for event in events)
+    return {
+        "events": len(events),
+        "kinds": dict(kinds),
+        "depths": dict(sorted(depths.items())),
+        "cutoff_rate": kinds["cutoff"] / interior if interior else 0.0,
+        "searched_fraction": searched / available if available else None,
+    }
+
+
+def traced_value(board, alpha, beta, Xisplaying, stats, tracer, depth=0):
+    """
+    Same search as max_value/min_value, returning (value, bestmove), but
+    records one TraceEvent per node in `tracer`.
+    """
+    mark = X if Xisplaying else O
+    if terminal(board):
+        v = utility(board)
+        tracer.record(TraceEvent("terminal", depth, mark, alpha, beta, v, 0, 0))
+        return v, None
+    alpha0, beta0 = alpha, beta
+    acts = actions(board)
+    searched = 0
+    bestmove = None
+    if Xisplaying:
+        stats.max_nodes += 1
+        v = float('-inf')
+    else:
+        stats.min_nodes += 1
+        v = float('inf')
+    for (i,j) in acts:
+        board[i][j] = mark
+        vnew, move = traced_value(board, alpha, beta, not Xisplaying, stats, tracer, depth+1)
+        board[i][j] = EMPTY
+        searched += 1
+        if Xisplaying:
+            alpha = max(alpha, vnew)
+            if vnew > v:
+                v = vnew
+                bestmove = (i,j)
+            if beta <= alpha or v==1:
+                break
+        else:
+            beta = min(beta, vnew)
+            if vnew < v:
+                v = vnew
+                bestmove = (i,j)
+            if v==-1 or beta <= alpha:
+                break
+    kind = "cutoff" if searched < len(acts) else "node"
+    tracer.record(TraceEvent(kind, depth, mark, alpha0, beta0, v, searched, len(acts)))
+    return v, bestmove
+
+
+class SearchTimeout(Exception):
+    """
+    Raised inside Search when the time budget runs out mid-iteration.
+    """
+
+
+def candidates(board):
+    """
+    Returns the empty cells worth searching: those next to at least one mark.
+    On an empty board only the centre cell is returned.
+    """
+    n = len(board)
+    cells = set()
+    marked = False
+    for i in range(n):
+        for j in range(n):
+            if board[i][j] is EMPTY:
+                continue
+            marked = True
+            for r in range(max(0, i-1), min(n, i+2)):
+                for c in range(max(0, j-1), min(n, j+2)):
+                    if board[r][c] is EMPTY:
+                        cells.add((r,c))
+    if not marked:
+        return [(n//2, n//2)]
+    if not cells:
+        return list(actions(board))
+    return list(cells)
+
+
+def win_score(n):
+    """
+    Returns the score Search gives a win on an n by n board, which
+    outscores the largest possible heuristic value.
+    """
+    k = min(K, n)
+    return len(lines(n, k)) * 10 ** k + 1
+
+
+class Search():
+    """
+    Iterative deepening alpha-beta search for boards too large to solve
+    exactly. Each iteration searches one ply deeper until the time budget
+    runs out; the best move of the last completed iteration is played.
+    Moves are ordered by the previous best move, then killer moves (moves
+    that caused a cutoff at the same ply), then the history table. At the
+    depth cutoff positions are scored with `evaluate`.
+    """
+
+    def __init__(self, time_limit=TIME_LIMIT, max_depth=None):
+        self.time_limit = time_limit
+        self.max_depth = max_depth
+        self.killers = dict() ## ply -> up to two moves that caused a cutoff
+        self.history = dict() ## move -> accumulated cutoff bonus
+        self.nodes = 0 ## nodes visited over all iterations
+        self.depth = 0 ## depth of the last completed iteration
+        self.value = 0 ## value of the last completed iteration, for the player to move
+        self.deadline = None
+        self.win = 0
+        self.root_move = None
+        self.shared_alpha = None ## root alpha shared with other processes, see parallel.py
+
+    def run(self, board):
+        """
+        Returns the best move found for the current player on the board.
+        The board itself is left untouched.
+        """
+        if terminal(board):
+            return None
+        self.deadline = None
+        if self.time_limit is not None:
+            self.deadline = time.perf_counter() + self.time_limit
+        n = len(board)
+        self.win = win_score(n)
+        mark = player(board)
+        empty = len(actions(board))
+        moves = candidates(board)
+        bestmove = self.order(moves, 0)[0]
+        if len(moves) == 1:
+            return bestmove
+        depth = 1
+        while self.max_depth is None or depth <= self.max_depth:
+            self.root_move = bestmove
+            try:
+                value = self.alphabeta(copy.deepcopy(board), mark, depth,
+                                       -self.win, self.win, 0)
+            except SearchTimeout:
+                break
+            bestmove = self.root_move
+            self.depth, self.value = depth, value
+            ## stop early once the game is decided or the whole tree is searched
+            if abs(value) > self.win - n*n or depth >= empty:
+                break
+            depth += 1
+        return bestmove
+
+    def order(self, moves, ply, first=None):
+        """
+        Returns `moves` sorted so the most promising are searched first.
+        """
+        killers = self.killers.get(ply, [])
+        def key(move):
+            if move == first:
+                return (0, 0)
+            if move in killers:
+                return (1, killers.index(move))
+            return (2, -self.history.get(move, 0))
+        return sorted(moves, key=key)
+
+    def alphabeta(self, board, mark, depth, alpha, beta, ply):
+        """
+        Negamax alpha-beta: returns the value of the board for `mark`,
+        the player to move. `board` is modified during the search.
+        """
+        self.nodes += 1
+        if self.nodes & 255 == 0 and self.deadline is not None \
+                and self.depth > 0 and time.perf_counter() > self.deadline:
+            raise SearchTimeout()
+        if depth == 0:
+            return evaluate(board) if mark == X else -evaluate(board)
+        moves = candidates(board)
+        if not moves:
+            return 0
+        other = O if mark == X else X
+        first = self.root_move if ply == 0 else None
+        best = -self.win
+        for move in self.order(moves, ply, first):
+            if ply == 1 and self.shared_alpha is not None:
+                ## another root move may have raised alpha since this one started
+                beta = min(beta, -self.shared_alpha.value)
+                if alpha >= beta:
+                    break
+            i, j = move
+            board[i][j] = mark
+            if wins_at(board, move):
+                ## prefer quicker wins and slower losses
+                value = self.win - ply - 1
+            else:
+                value = -self.alphabeta(board, other, depth-1, -beta, -alpha, ply+1)
+            board[i][j] = EMPTY
+            if value > best:
+                best = value
+                if ply == 0:
+                    self.root_move = move
+            alpha = max(alpha, value)
+            if alpha >= beta:
+                killers = self.killers.setdefault(ply, [])
+                if move not in killers:
+                    killers.insert(0, move)
+                    del killers[2:]
+                self.history[move] = self.history.get(move, 0) + depth*depth
+                break
+        return best
+
+
+## Solved table for the standard 3x3 game.
+## Every reachable position is reduced to a canonical form under the 8
+## symmetries of the square and encoded in base 3 (EMPTY=0, X=1, O=2).
+## The file is a sequence of 3 byte records: the code as an unsigned short,
+## then one byte holding the best move's cell index (i*3+j) in the upper
+## bits and the value (utility + 1) in the lowest two bits.
+BOOK_RECORD = struct.Struct("<HB")
+CELL_CODES = {EMPTY: 0, X: 1, O: 2}
+
+
+@functools.lru_cache(maxsize=None)
+def symmetries(n):
+    """
+    Returns the 8 symmetries of an n by n board as permutations of cell
+    indices: perm[i*n+j] is the index that cell (i, j) is moved to.
+    """
+    perms = []
+    for rotations in range(4):
+        for flip in (False, True):
+            perm = []
+            for i in range(n):
+                for j in range(n):
+                    r, c = (i, n-1-j) if flip else (i, j)
+                    for _ in range(rotations):
+                        r, c = c, n-1-r
+                    perm.append(r*n + c)
+            perms.append(tuple(perm))
+    return tuple(perms)
+
+
+def canonical(board):
+    """
+    Returns (code, perm) where code is the smallest base 3 encoding of the
+    board over all of its symmetries and perm is the symmetry that gives it.
+    """
+    n = len(board)
+    cells = [CELL_CODES[x] for row in board for x in row]
+    best = None
+    for perm in symmetries(n):
+        code = 0
+        for idx, value in enumerate(cells):
+            code += value * 3 ** perm[idx]
+        if best is None or code < best[0]:
+            best = (code, perm)
+    return best
+
+
+def build_book(path=BOOK_FILE):
+    """
+    Solves every reachable 3x3 position with the alpha-beta search and
+    writes the best move and value of each canonical position to `path`.
+    Returns the number of positions written.
+    """
+    table = dict()
+    frontier = [initial_state()]
+    seen = set()
+    while frontier:
+        board = frontier.pop()
+        code, perm = canonical(board)
+        if code in seen:
+            continue
+        seen.add(code)
+        if terminal(board):
+            continue
+        if player(board) == X:
+            v, move = max_value(board, float('-inf'), float('inf'))
+        else:
+            v, move = min_value(board, float('-inf'), float('inf'))
+        ## store the move in canonical coordinates
+        table[code] = (perm[move[0]*3 + move[1]], v)
+        for action in actions(board):
+            frontier.append(result(board, action))
+    with open(path, "wb") as f:
+        for code in sorted(table):
+            idx, v = table[code]
+            f.write(BOOK_RECORD.pack(code, idx << 2 | (v + 1)))
+    return len(table)
+
+
+def load_book(path=BOOK_FILE):
+    """
+    Returns the solved table in `path` as a dict of code -> (cell index, value),
+    or an empty dict if the file does not exist.
+    """
+    table = dict()
+    if not os.path.exists(path):
+        return table
+    with open(path, "rb") as f:
+        data = f.read()
+    for code, packed in BOOK_RECORD.iter_unpack(data):
+        table[code] = (packed >> 2, (packed & 3) - 1)
+    return table
+
+
+def book_lookup(board):
+    """
+    Returns (action, value) for a 3x3 board from the solved table, where value
+    is the game's utility under perfect play, or None if the position is not
+    in the table.
+    """
+    global book
+    if book is None:
+        with book_lock:
+            if book is None:
+                book = load_book()
+    code, perm = canonical(board)
+    if code not in book:
+        return None
+    idx, v = book[code]
+    ## map the canonical move back through the inverse symmetry
+    cell = perm.index(idx)
+    return (cell // 3, cell % 3), v
+
+
+def book_move(board):
+    """
+    Returns the optimal action for a 3x3 board from the solved table, or None
+    if the table is unavailable.
+    """
+    entry = book_lookup(board)
+    return entry[0] if entry is not None else None
+
+
+class TracedSearch(Search):
+    """
+    Search that records one TraceEvent per node in `tracer`.
+    """
+
+    def __init__(self, tracer, time_limit=TIME_LIMIT, max_depth=None):
+        super().__init__(time_limit=time_limit, max_depth=max_depth)
+        self.tracer = tracer
+
+    def alphabeta(self, board, mark, depth, alpha, beta, ply):
+        value = super().alphabeta(board, mark, depth, alpha, beta, ply)
+        if depth == 0:
+            kind = "leaf"
+        elif value >= beta:
+            kind = "cutoff"
+        else:
+            kind = "node"
+        self.tracer.record(TraceEvent(kind, ply, mark, alpha, beta, value, None, None))
+        return value
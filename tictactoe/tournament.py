@@ -0,0 +1,165 @@
+"""
+Headless self-play tournament and benchmark for the Tic Tac Toe engines
+"""
+
+import contextlib
+import io
+import multiprocessing
+import random
+import sys
+import time
+
+import tictactoe as ttt
+
+
+def engine_book(board):
+    """
+    search: solved table for 3x3, exact or iterative search otherwise.
+    """
+    move, stats = ttt.search(board)
+    return move, stats.nodes
+
+
+def engine_minimax(board):
+    """
+    Exact alpha-beta search with max_value/min_value, without the solved table.
+    """
+    stats = ttt.SearchStats()
+    board = [list(row) for row in board]
+    if ttt.player(board) == ttt.X:
+        _, move = ttt.max_value(board, float('-inf'), float('inf'), stats)
+    else:
+        _, move = ttt.min_value(board, float('-inf'), float('inf'), stats)
+    return move, stats.nodes
+
+
+def engine_minimax_old(board):
+    """
+    minimax_old, with its printed summary suppressed.
+    """
+    with contextlib.redirect_stdout(io.StringIO()):
+        move = ttt.minimax_old([list(row) for row in board])
+    return move, ttt.minsteps + ttt.maxsteps
+
+
+def engine_iterative(board):
+    """
+    Iterative deepening Search without a time limit, which searches to the end.
+    """
+    search = ttt.Search(time_limit=None)
+    move = search.run(board)
+    return move, search.nodes
+
+
+def engine_random(board, rng):
+    return rng.choice(sorted(ttt.actions(board))), 0
+
+
+ENGINES = {
+    "book": engine_book,
+    "minimax": engine_minimax,
+    "minimax_old": engine_minimax_old,
+    "iterative": engine_iterative,
+}
+
+
+def play_game(x, o, seed):
+    """
+    Plays one game between engines named `x` and `o` ("random" for a random
+    player seeded with `seed`). Returns (winner, stats) where stats maps
+    each engine name to [moves, nodes, seconds] spent in this game.
+    """
+    rng = random.Random(seed)
+    board = ttt.initial_state()
+    stats = {x: [0, 0, 0.0], o: [0, 0, 0.0]}
+    while not ttt.terminal(board):
+        name = x if ttt.player(board) == ttt.X else o
+        start = time.perf_counter()
+        if name == "random":
+            move, nodes = engine_random(board, rng)
+        else:
+            move, nodes = ENGINES[name](board)
+        elapsed = time.perf_counter() - start
+        stats[name][0] += 1
+        stats[name][1] += nodes
+        stats[name][2] += elapsed
+        board = ttt.result(board, move)
+    return ttt.winner(board), stats
+
+
+def play_match(x, o, games, processes=None):
+    """
+    Plays `games` games of `x` against `o` across a process pool.
+    Returns (results, stats, seconds), where results counts "X", "O" and
+    "draw" and stats totals [moves, nodes, seconds] per engine.
+    """
+    start = time.perf_counter()
+    with multiprocessing.Pool(processes) as pool:
+        outcomes = pool.starmap(play_game, [(x, o, seed) for seed in range(games)])
+    elapsed = time.perf_counter() - start
+    results = {"X": 0, "O": 0, "draw": 0}
+    stats = dict()
+    for winner, game_stats in outcomes:
+        results[winner or "draw"] += 1
+        for name, values in game_stats.items():
+            totals = stats.setdefault(name, [0, 0, 0.0])
+            for i, value in enumerate(values):
+                totals[i] += value
+    return results, stats, elapsed
+
+
+def check(x, o, results):
+    """
+    Returns a list of perfect-play violations in a match's results:
+    an engine must never lose, and two engines must always draw.
+    """
+    problems = []
+    if x != "random" and results["O"]:
+        problems.append(f"{x} lost {results['O']} games as X against {o}")
+    if o != "random" and results["X"]:
+        problems.append(f"{o} lost {results['X']} games as O against {x}")
+    return problems
+
+
+def main():
+    if len(sys.argv) > 3:
+        sys.exit("Usage: python tournament.py [games] [engine,engine,...]")
+    games = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    engines = sys.argv[2].split(",") if len(sys.argv) > 2 else list(ENGINES)
+
+    ## engines are deterministic, so games between two of them repeat exactly
+    matches = []
+    for x in engines:
+        for o in engines:
+            matches.append((x, o, 1))
+        matches.append((x, "random", games))
+        matches.append(("random", x, games))
+
+    totals = dict()
+    problems = []
+    for x, o, count in matches:
+        results, stats, elapsed = play_match(x, o, count)
+        print(f"{x} (X) vs {o} (O): {count} games, X wins {results['X']}, "
+              f"O wins {results['O']}, draws {results['draw']}, "
+              f"{count / elapsed:.1f} games/s")
+        problems.extend(check(x, o, results))
+        for name, values in stats.items():
+            total = totals.setdefault(name, [0, 0, 0.0])
+            for i, value in enumerate(values):
+                total[i] += value
+
+    print()
+    for name in engines:
+        moves, nodes, seconds = totals[name]
+        print(f"{name}: {moves} moves, {nodes / moves:.1f} nodes/move, "
+              f"{1000 * seconds / moves:.3f} ms/move")
+    print()
+    if problems:
+        for problem in problems:
+            print(f"FAIL: {problem}")
+        sys.exit(1)
+    print("All engines played perfectly.")
+
+
+if __name__ == "__main__":
+    main()